@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import re
+import sqlite3
+from typing import Any, Iterable, Sequence
+from dotaz import Join, Podminka
+
+# Řádek plánu s přístupem k tabulce, např. 'SCAN prodeje'
+# nebo 'SEARCH datumy USING INDEX ix (datum_id=?)', starší
+# verze SQLite mají navíc slovo TABLE
+RADEK_PRISTUPU = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?')
+# Rovnost dvou sloupců v podmínce joinu
+ROVNOST = re.compile(r'(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)')
+
+
+def citace(nazev: str) -> str:
+    return '"' + nazev.replace('"', '""') + '"'
+
+
+def nazev_indexu(tabulka: str, sloupec: str) -> str:
+    return f'ix_{tabulka}_{sloupec}'
+
+
+def prikaz_indexu(tabulka: str, sloupec: str) -> str:
+    return f'create index {nazev_indexu(tabulka, sloupec)} on {tabulka} ({sloupec})'
+
+
+def vytvoreni_databaze(
+        katalog: dict[str, list[str]],
+        indexy: Iterable[tuple[str, str]] = ()
+    ) -> sqlite3.Connection:
+    """
+    Vytvoří prázdnou databázi v paměti s tabulkami z katalogu
+    a případně se zadanými indexy (tabulka, sloupec)
+    """
+    spojeni = sqlite3.connect(':memory:')
+    for tabulka, sloupce in katalog.items():
+        if not sloupce:
+            continue
+        spojeni.execute(
+            f'create table {citace(tabulka)} ({", ".join(citace(i) for i in sloupce)})'
+        )
+    for tabulka, sloupec in indexy:
+        spojeni.execute(
+            f'create index {citace(nazev_indexu(tabulka, sloupec))} '
+            f'on {citace(tabulka)} ({citace(sloupec)})'
+        )
+    return spojeni
+
+
+def plan_dotazu(
+        spojeni: sqlite3.Connection,
+        sql: str,
+        parametry: Sequence[Any] | dict[str, Any] = ()
+    ) -> list[dict[str, Any]]:
+    """
+    Vrací řádky EXPLAIN QUERY PLAN, hloubka odpovídá
+    zanoření řádku pod rodičem. Dotaz se zástupnými znaky
+    ? nebo :nazev potřebuje hodnotu pro každý z nich
+    """
+    radky = spojeni.execute(f'explain query plan {sql}', parametry).fetchall()
+    hloubky: dict[int, int] = {0: -1}
+    res = []
+    for id, rodic, _, detail in radky:
+        hloubky[id] = hloubky.get(rodic, -1) + 1
+        res.append({'id': id, 'hloubka': hloubky[id], 'detail': detail})
+    return res
+
+
+def rozbor_planu(plan: list[dict[str, Any]]) -> dict[str, list[str]]:
+    """
+    Z plánu vybere pořadí přístupu k tabulkám, úplné průchody
+    tabulek, dočasné B-stromy a automatické indexy. Problémem
+    je úplný průchod nebo automatický index u tabulky, která
+    se nečte jako první, tedy ve vnořené smyčce joinu
+    """
+    poradi: list[str] = []
+    skeny: list[str] = []
+    docasne: list[str] = []
+    problemy: list[str] = []
+
+    for radek in plan:
+        detail = radek['detail']
+        if 'TEMP B-TREE' in detail:
+            docasne.append(detail)
+
+        shoda = RADEK_PRISTUPU.match(detail)
+        if shoda is None:
+            continue
+        tabulka = shoda.group(3) or shoda.group(2)
+        vnorena = bool(poradi)
+        poradi.append(tabulka)
+
+        if shoda.group(1) == 'SCAN':
+            skeny.append(detail)
+            if vnorena:
+                problemy.append(f'Úplný průchod tabulky {tabulka} ve vnořené smyčce: {detail}')
+        elif 'AUTOMATIC' in detail:
+            problemy.append(f'Chybí index, SQLite si ho vytváří při každém dotazu: {detail}')
+
+    return {
+        'poradi_joinu': poradi,
+        'skeny': skeny,
+        'docasne_stromy': docasne,
+        'problemy': problemy
+    }
+
+
+def doporucene_indexy(
+        katalog: dict[str, list[str]],
+        joiny: Iterable[Join],
+        podminky: Iterable[Podminka]
+    ) -> list[tuple[str, str]]:
+    """
+    Indexy na sloupcích z rovností v podmínkách joinů, na obou
+    stranách, protože pořadí tabulek volí až optimalizátor,
+    a na sloupcích z podmínek where, jen u sloupců z katalogu
+    """
+    res: dict[tuple[str, str], None] = {}
+
+    def pridani(tabulka: str, sloupec: str) -> None:
+        if sloupec in katalog.get(tabulka, ()):
+            res[(tabulka, sloupec)] = None
+
+    for join in joiny:
+        for shoda in ROVNOST.finditer(join.zbytek):
+            pridani(*shoda.group(1, 2))
+            pridani(*shoda.group(3, 4))
+
+    for podminka in podminky:
+        tabulka, _, sloupec = podminka.sloupec.partition('.')
+        if sloupec:
+            pridani(tabulka, sloupec)
+
+    return list(res)
+
+
+def analyza(
+        katalog: dict[str, list[str]],
+        sql: str,
+        joiny: Iterable[Join] = (),
+        podminky: Iterable[Podminka] = (),
+        parametry: Sequence[Any] | dict[str, Any] = ()
+    ) -> dict[str, Any]:
+    """
+    Spustí EXPLAIN QUERY PLAN nad prázdnou databází z katalogu,
+    navrhne indexy a ověří, jak se s nimi plán změní. Parametry
+    jsou hodnoty zástupných znaků dotazu ve stylu qmark nebo named
+    """
+    res: dict[str, Any] = {'chyba': None}
+
+    spojeni = vytvoreni_databaze(katalog)
+    try:
+        plan = plan_dotazu(spojeni, sql, parametry)
+    except sqlite3.Error as e:
+        # dotaz může používat syntaxi, kterou SQLite nezná
+        res['chyba'] = str(e)
+        return res
+    finally:
+        spojeni.close()
+
+    res['plan'] = [f'{"  " * i["hloubka"]}{i["detail"]}' for i in plan]
+    res.update(rozbor_planu(plan))
+
+    indexy = doporucene_indexy(katalog, joiny, podminky)
+    res['doporucene_indexy'] = [prikaz_indexu(*i) for i in indexy]
+
+    if indexy:
+        spojeni = vytvoreni_databaze(katalog, indexy)
+        try:
+            plan = plan_dotazu(spojeni, sql, parametry)
+        finally:
+            spojeni.close()
+        res['plan_s_indexy'] = [f'{"  " * i["hloubka"]}{i["detail"]}' for i in plan]
+        res['problemy_s_indexy'] = rozbor_planu(plan)['problemy']
+
+    return res
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from typing import Any
+from main import FAZE
+from mereni import Mereni
+from query_builder import Jadro
+from zapsani import Zapsani
+
+# Výchozí velikosti katalogu: (počet tabulek, počet sloupců v tabulce)
+VELIKOSTI = ((100, 10), (1000, 50), (5000, 100))
+# Počet tabulek, ze kterých se vybírají sloupce do dotazu
+VYBRANE_TABULKY = 20
+
+
+def nazev_tabulky(i: int) -> str:
+    return f't_{i:05d}'
+
+
+def generovani_projektu(
+        cesta: str,
+        pocet_tabulek: int,
+        pocet_sloupcu: int,
+        seed: int = 0
+    ) -> None:
+    """
+    Vytvoří ve složce cesta/src syntetický katalog sloupce.csv
+    a k němu upravená schémata tabulek, celkove.txt a joiny.txt,
+    jako by je už analytik jednou prošel
+
+    Tabulky tvoří strom: tabulka i má vlastní klíč t_i_id
+    a odkaz na rodiče (i - 1) // 2, prvních několik tabulek
+    se vybere do dotazu a napojí se na rodiče
+    """
+    rnd = random.Random(seed)
+    src = os.path.join(cesta, Jadro.slozka)
+    os.makedirs(src, exist_ok=True)
+    z = Zapsani(src)
+
+    vybrane = min(VYBRANE_TABULKY, pocet_tabulek)
+    schema_celkove: dict[str, Any] = {}
+    joiny: dict[str, Any] = {}
+
+    with open(os.path.join(src, 'sloupce.csv'), 'w', encoding='utf8') as f:
+        f.write('tabulka;sloupec\n')
+
+        for i in range(pocet_tabulek):
+            t = nazev_tabulky(i)
+            rodic = nazev_tabulky((i - 1) // 2) if i else ''
+
+            sloupce = [f'{t}_id']
+            if rodic:
+                sloupce.append(f'{rodic}_id')
+            sloupce += [f'sloupec_{j:03d}' for j in range(max(0, pocet_sloupcu - len(sloupce)))]
+
+            for s in sloupce:
+                f.write(f'{t};{s}\n')
+
+            # upravené schéma tabulky, u vybraných tabulek
+            # jsou zvolené tři sloupce
+            zvolene = set(rnd.sample(sloupce, min(3, len(sloupce)))) if i < vybrane else set()
+            z.zapsani_json(
+                z.vystupni_soubor(f'{t}.txt'),
+                {t: {'sloupce': {s: int(s in zvolene) for s in sloupce}, 'alias': ''}}
+            )
+
+            vazba = [['', '']]
+            if rodic and i < vybrane:
+                vazba = [['left join', f'{t} on {t}.{rodic}_id = {rodic}.{rodic}_id']]
+            joiny[t] = {'vychozi': int(i == 0), 'je_poddotaz': 0, 'sql': '', 'vazba': vazba}
+
+            if zvolene:
+                atributy = {}
+                for s in sloupce:
+                    if s not in zvolene:
+                        continue
+                    agg = rnd.choice(['', '', 'sum', 'max'])
+                    atributy[f'{t}.{s}'] = {
+                        'agg': agg,
+                        'alias': f'{t}_{s}' if agg else '',
+                        'skryty': '',
+                        'podminky': [['>', str(rnd.randint(0, 100))]] if rnd.random() < 0.2 else [['', '']]
+                    }
+                schema_celkove[t] = {'sloupce': atributy, 'alias': ''}
+
+    z.zapsani_json(z.vystupni_soubor('celkove.txt'), schema_celkove)
+    z.zapsani_json(z.vystupni_soubor('joiny.txt'), joiny)
+
+
+def mereni_behu(cesta: str, pocet_vlaken: int, pamet: bool) -> dict[str, Any]:
+    """
+    Projde všechny fáze z main.py a u každé změří čas
+    a případně špičku alokované paměti
+    """
+    mereni = Mereni(pamet=pamet)
+    mereni.spusteni()
+
+    with mereni.faze('nacteni_katalogu'):
+        jadro = Jadro(cesta, pocet_vlaken=pocet_vlaken)
+    for faze in FAZE:
+        with mereni.faze(faze):
+            getattr(jadro, faze)()
+
+    mereni.ukonceni()
+    return {
+        nazev: {'cas': i['cas'], 'pamet': i.get('spicka_pameti', 0)}
+        for nazev, i in mereni.faze_vysledky.items()
+    }
+
+
+def beh_sady(
+        velikosti: list[tuple[int, int]],
+        opakovani: int,
+        pocet_vlaken: int,
+        pamet: bool
+    ) -> dict[str, Any]:
+    """
+    Pro každou velikost katalogu vygeneruje projekt a změří fáze,
+    z opakování se bere nejkratší čas a nejvyšší paměť
+    """
+    vysledky = []
+
+    if pamet:
+        tracemalloc.start()
+
+    for pocet_tabulek, pocet_sloupcu in velikosti:
+        faze: dict[str, dict[str, float]] = {}
+
+        for _ in range(opakovani):
+            # každé opakování začíná ze stejného stavu souborů
+            cesta = tempfile.mkdtemp(prefix='qb-bench-')
+            try:
+                generovani_projektu(cesta, pocet_tabulek, pocet_sloupcu)
+                for nazev, hodnoty in mereni_behu(cesta, pocet_vlaken, pamet).items():
+                    if nazev not in faze:
+                        faze[nazev] = dict(hodnoty)
+                    else:
+                        faze[nazev]['cas'] = min(faze[nazev]['cas'], hodnoty['cas'])
+                        faze[nazev]['pamet'] = max(faze[nazev]['pamet'], hodnoty['pamet'])
+            finally:
+                shutil.rmtree(cesta, ignore_errors=True)
+
+        vysledky.append({
+            'tabulky': pocet_tabulek,
+            'sloupce': pocet_sloupcu,
+            'celkem': sum(i['cas'] for i in faze.values()),
+            'faze': faze
+        })
+        print(f'{pocet_tabulek} x {pocet_sloupcu}: {vysledky[-1]["celkem"]:.3f} s')
+
+    if pamet:
+        tracemalloc.stop()
+
+    return {
+        'python': platform.python_version(),
+        'platforma': platform.platform(),
+        'opakovani': opakovani,
+        'pocet_vlaken': pocet_vlaken,
+        'pamet': pamet,
+        'vysledky': vysledky
+    }
+
+
+def porovnani(
+        aktualni: dict[str, Any],
+        zaklad: dict[str, Any],
+        tolerance: float,
+        minimum: float
+    ) -> list[str]:
+    """
+    Porovná výsledky s uloženým základem a vrací seznam regresí,
+    tedy fází, které jsou pomalejší o víc než toleranci
+    a zároveň o víc než minimum sekund
+    """
+    regrese = []
+    zaklady = {(i['tabulky'], i['sloupce']): i for i in zaklad['vysledky']}
+
+    for vysledek in aktualni['vysledky']:
+        puvodni = zaklady.get((vysledek['tabulky'], vysledek['sloupce']))
+        if puvodni is None:
+            continue
+
+        for nazev, hodnoty in vysledek['faze'].items():
+            if nazev not in puvodni['faze']:
+                continue
+            pred = puvodni['faze'][nazev]['cas']
+            ted = hodnoty['cas']
+            if ted > pred * (1 + tolerance) and ted - pred > minimum:
+                regrese.append(
+                    f'{vysledek["tabulky"]} x {vysledek["sloupce"]} {nazev}: '
+                    f'{pred:.4f} s -> {ted:.4f} s'
+                )
+
+    return regrese
+
+
+def parsovani_velikosti(text: str) -> tuple[int, int]:
+    tabulky, sloupce = text.lower().split('x')
+    return int(tabulky), int(sloupce)
+
+
+# Hlavní metoda skriptu
+def main() -> int:
+
+    parser = argparse.ArgumentParser(
+        description='Měření jednotlivých fází sestavení nad syntetickým katalogem'
+    )
+    parser.add_argument(
+        '--velikost', action='append', type=parsovani_velikosti,
+        help='velikost katalogu ve tvaru TABULKYxSLOUPCE, lze zadat víckrát'
+    )
+    parser.add_argument('--opakovani', type=int, default=3)
+    parser.add_argument('--vlakna', type=int, default=1)
+    parser.add_argument('--bez-pameti', action='store_true', help='neměřit paměť, měření je pak rychlejší')
+    parser.add_argument('--vystup', default='benchmark.json')
+    parser.add_argument('--porovnani', help='soubor s uloženým základem pro kontrolu regresí')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--minimum', type=float, default=0.005)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    aktualni = beh_sady(
+        args.velikost or list(VELIKOSTI),
+        args.opakovani,
+        args.vlakna,
+        not args.bez_pameti
+    )
+
+    with open(args.vystup, 'w', encoding='utf8') as f:
+        json.dump(aktualni, f, ensure_ascii=False, indent=4)
+    print(f'Výsledky zapsané do {args.vystup}')
+
+    if args.porovnani:
+        with open(args.porovnani, 'r', encoding='utf8') as f:
+            zaklad = json.load(f)
+        regrese = porovnani(aktualni, zaklad, args.tolerance, args.minimum)
+        for i in regrese:
+            print(f'REGRESE {i}')
+        if regrese:
+            return 1
+        print('Bez regresí.')
+
+    return 0
+
+
+# Hlavní vlákno skriptu
+if __name__ == "__main__":
+    sys.exit(main())
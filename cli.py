@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import os
+import sys
+
+# Moduly sestavení se importují až uvnitř příkazů, takže
+# nápověda a chybné argumenty nečekají na jejich načtení
+
+# Soubory, které musí existovat před sestavením SQL
+SOUBORY_BUILD = ('celkove.txt', 'joiny.txt')
+
+
+def nacteni_katalogu_sqlite(cesta: str) -> dict[str, list[str]]:
+    """
+    Načte katalog tabulek a sloupců ze SQLite databáze
+    """
+    import sqlite3
+    from katalog_db import SqliteZdroj, nacteni_katalogu
+
+    spojeni = sqlite3.connect(f'file:{cesta}?mode=ro', uri=True)
+    try:
+        return nacteni_katalogu(SqliteZdroj(spojeni))
+    finally:
+        spojeni.close()
+
+
+def spusteni_fazi(
+        args: argparse.Namespace,
+        faze: tuple[str, ...],
+        s_manifestem: bool,
+        vysledek: dict | None = None
+    ) -> int:
+    """
+    Spustí zadané fáze na objektu Jadro nad složkou projektu,
+    do slovníku vysledek se případně vloží použité jádro
+    """
+    import main
+    from manifest import Manifest
+    from mereni import Mereni
+    from query_builder import Jadro
+    from uloziste import vytvoreni_uloziste
+
+    slozka = os.path.join(args.cesta, Jadro.slozka)
+    if not os.path.isdir(slozka):
+        logging.error(f'Složka {slozka} neexistuje.')
+        return 2
+
+    mereni = Mereni(args.mereni is not None, profil_faze=args.profil_faze)
+    mereni.spusteni()
+
+    # katalog z databáze místo souboru sloupce.csv,
+    # v manifestu se pak porovnává jeho otisk
+    katalog = None
+    otisk = None
+    if getattr(args, 'katalog_sqlite', None):
+        with mereni.faze('nacteni_katalogu_z_db'):
+            katalog = nacteni_katalogu_sqlite(args.katalog_sqlite)
+        otisk = Manifest.hash_katalogu(katalog)
+
+    automaticke_joiny = args.automaticke_joiny or main.AUTOMATICKE_JOINY
+    paramstyle = getattr(args, 'paramstyle', None) or main.PARAMSTYLE
+
+    manifest = None
+    if s_manifestem:
+        manifest = Manifest(
+            slozka,
+            otisk_katalogu=otisk,
+            nastaveni=Manifest.nastaveni_sestaveni(paramstyle, automaticke_joiny)
+        )
+        if manifest.je_aktualni():
+            logging.info('Vstupy se nezměnily, výstup je aktuální.')
+            mereni.ukonceni()
+            return 0
+
+    uloziste = vytvoreni_uloziste(args.uloziste or main.ULOZISTE, slozka)
+    with mereni.faze('nacteni_katalogu'):
+        jadro = Jadro(args.cesta, manifest, args.vlakna or main.POCET_VLAKEN, uloziste, katalog)
+    jadro.automaticke_joiny = automaticke_joiny
+    jadro.paramstyle = paramstyle
+    if getattr(args, 'format', None):
+        jadro.format_exportu = args.format
+
+    for i in faze:
+        with mereni.faze(i):
+            getattr(jadro, i)()
+
+    uloziste.uzavreni()
+    if vysledek is not None:
+        vysledek['jadro'] = jadro
+
+    mereni.ukonceni()
+    mereni.zaznam_poctu(jadro)
+    mereni.ulozeni(args.mereni)
+
+    if jadro.chyby:
+        for tabulka, chyba in jadro.chyby.items():
+            logging.error(f'Chyba u tabulky {tabulka}: {chyba}')
+        return 1
+    return 0
+
+
+def prikaz_init(args: argparse.Namespace) -> int:
+    from main import FAZE_INIT
+    return spusteni_fazi(args, FAZE_INIT, False)
+
+
+def prikaz_merge(args: argparse.Namespace) -> int:
+    from main import FAZE_MERGE
+    return spusteni_fazi(args, FAZE_MERGE, False)
+
+
+def kontrola_vstupu_build(cesta: str) -> bool:
+    """
+    Zjistí, zda existují soubory potřebné pro sestavení SQL
+    """
+    from query_builder import Jadro
+
+    for i in SOUBORY_BUILD:
+        if not os.path.exists(os.path.join(cesta, Jadro.slozka, i)):
+            logging.error(f'Soubor {i} neexistuje, nejdříve spusťte init a merge.')
+            return False
+    return True
+
+
+def prikaz_build(args: argparse.Namespace) -> int:
+    from main import FAZE_BUILD
+    if not kontrola_vstupu_build(args.cesta):
+        return 2
+    return spusteni_fazi(args, FAZE_BUILD, False)
+
+
+def prikaz_export(args: argparse.Namespace) -> int:
+    from main import FAZE_EXPORT
+    if not kontrola_vstupu_build(args.cesta):
+        return 2
+    return spusteni_fazi(args, FAZE_EXPORT, False)
+
+
+def prikaz_analyze(args: argparse.Namespace) -> int:
+    from main import FAZE_ANALYZA
+    if not kontrola_vstupu_build(args.cesta):
+        return 2
+
+    vysledek = {}
+    res = spusteni_fazi(args, FAZE_ANALYZA, False, vysledek)
+    if res:
+        return res
+
+    analyza = vysledek['jadro'].analyza
+    if args.prisne:
+        for i in (analyza, analyza.get('dalsi_stranka')):
+            if i is not None and (i['chyba'] or i.get('problemy')):
+                return 1
+    return 0
+
+
+def otevreni_sqlite_uloziste(cesta: str):
+    """
+    Otevře existující SQLite úložiště schémat projektu,
+    prázdnou databázi nevytváří
+    """
+    from query_builder import Jadro
+    from uloziste import SqliteUloziste
+
+    slozka = os.path.join(cesta, Jadro.slozka)
+    if not os.path.exists(os.path.join(slozka, 'schemata.db')):
+        logging.error(f'Ve složce {slozka} není úložiště schemata.db.')
+        return None
+    return SqliteUloziste(slozka)
+
+
+def prikaz_schema_export(args: argparse.Namespace) -> int:
+    uloziste = otevreni_sqlite_uloziste(args.cesta)
+    if uloziste is None:
+        return 2
+    try:
+        uloziste.export_do_souboru(args.tabulky)
+    finally:
+        uloziste.uzavreni()
+    return 0
+
+
+def prikaz_schema_import(args: argparse.Namespace) -> int:
+    uloziste = otevreni_sqlite_uloziste(args.cesta)
+    if uloziste is None:
+        return 2
+    try:
+        uloziste.import_ze_souboru(args.tabulky or uloziste.seznam_tabulek())
+    finally:
+        uloziste.uzavreni()
+    return 0
+
+
+def prikaz_all(args: argparse.Namespace) -> int:
+    from main import FAZE
+    return spusteni_fazi(args, FAZE, True)
+
+
+def prikaz_watch(args: argparse.Namespace) -> int:
+    import main
+    from query_builder import Jadro
+    from sledovani import Sledovani
+
+    slozka = os.path.join(args.cesta, Jadro.slozka)
+    if not os.path.isdir(slozka):
+        logging.error(f'Složka {slozka} neexistuje.')
+        return 2
+
+    sledovani = Sledovani(
+        args.cesta,
+        args.vlakna or main.POCET_VLAKEN,
+        args.uloziste or main.ULOZISTE,
+        args.interval,
+        args.automaticke_joiny or main.AUTOMATICKE_JOINY,
+        args.paramstyle or main.PARAMSTYLE
+    )
+    sledovani.beh()
+    return 0
+
+
+def vytvoreni_parseru() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Sestavení SQL příkazu select ze schémat tabulek'
+    )
+    parser.add_argument('-q', '--tichy', action='store_true', help='vypisovat jen chyby')
+
+    spolecne = argparse.ArgumentParser(add_help=False)
+    spolecne.add_argument('cesta', nargs='?', default='.', help='složka projektu s podsložkou src')
+    spolecne.add_argument('--vlakna', type=int, default=None, help='počet vláken, výchozí podle main.py')
+    spolecne.add_argument('--uloziste', choices=('soubory', 'sqlite'), default=None)
+    spolecne.add_argument('--mereni', default=None, help='cesta k JSON reportu s měřením fází')
+    spolecne.add_argument('--profil-faze', default=None, help='fáze, ze které se uloží profil cProfile')
+    spolecne.add_argument(
+        '--automaticke-joiny', action='store_true',
+        help='dohledat chybějící joiny vybraných tabulek po klíčových sloupcích *_id'
+    )
+
+    spolecne.add_argument(
+        '--paramstyle', choices=('qmark', 'numeric', 'named', 'format', 'pyformat'), default=None,
+        help='hodnoty podmínek jako parametry do output-parametry.json'
+    )
+
+    # zdroj katalogu mají příkazy, které běží jednou
+    sestaveni = argparse.ArgumentParser(add_help=False, parents=[spolecne])
+    sestaveni.add_argument(
+        '--katalog-sqlite', default=None,
+        help='načíst katalog ze SQLite databáze místo souboru sloupce.csv'
+    )
+
+    prikazy = parser.add_subparsers(dest='prikaz', required=True)
+    prikazy.add_parser(
+        'init', parents=[sestaveni],
+        help='vytvoří chybějící schémata tabulek a soubor joinů'
+    ).set_defaults(funkce=prikaz_init)
+    prikazy.add_parser(
+        'merge', parents=[sestaveni],
+        help='doplní nové tabulky a sloupce do upravených schémat a celkového schéma'
+    ).set_defaults(funkce=prikaz_merge)
+    prikazy.add_parser(
+        'build', parents=[sestaveni],
+        help='sestaví SQL z celkového schéma a joinů'
+    ).set_defaults(funkce=prikaz_build)
+    analyze = prikazy.add_parser(
+        'analyze', parents=[sestaveni],
+        help='sestaví SQL, ověří jeho plán a doporučí indexy do output-analyza.json'
+    )
+    analyze.add_argument(
+        '--prisne', action='store_true',
+        help='skončit s chybou, když plán obsahuje úplné průchody ve vnořených smyčkách'
+    )
+    analyze.set_defaults(funkce=prikaz_analyze)
+    export = prikazy.add_parser(
+        'export', parents=[sestaveni],
+        help='vyexportuje katalog, výběr sloupců, sloupce dotazu a joiny'
+    )
+    export.add_argument('--format', choices=('xlsx', 'csv'), default='xlsx')
+    export.set_defaults(funkce=prikaz_export)
+    watch = prikazy.add_parser(
+        'watch', parents=[spolecne],
+        help='sleduje úpravy schémat a po uložení znovu sestaví SQL'
+    )
+    watch.add_argument('--interval', type=float, default=0.2, help='sekundy mezi kontrolami změn')
+    watch.set_defaults(funkce=prikaz_watch)
+
+    # ruční úpravy schémat při úložišti sqlite: export do souborů
+    # <tabulka>.txt, úprava a import zpět do schemata.db
+    tabulky = argparse.ArgumentParser(add_help=False)
+    tabulky.add_argument('cesta', nargs='?', default='.', help='složka projektu s podsložkou src')
+    tabulky.add_argument('--tabulky', nargs='+', default=None, help='jen zadané tabulky, výchozí všechny')
+    prikazy.add_parser(
+        'schema-export', parents=[tabulky],
+        help='vypíše schémata z úložiště schemata.db do souborů <tabulka>.txt'
+    ).set_defaults(funkce=prikaz_schema_export)
+    prikazy.add_parser(
+        'schema-import', parents=[tabulky],
+        help='načte upravené soubory <tabulka>.txt zpět do úložiště schemata.db'
+    ).set_defaults(funkce=prikaz_schema_import)
+    prikazy.add_parser(
+        'all', parents=[sestaveni],
+        help='všechny fáze, přeskočí se, když se vstupy od posledního běhu nezměnily'
+    ).set_defaults(funkce=prikaz_all)
+
+    return parser
+
+
+# Hlavní metoda skriptu
+def main(argv: list[str] | None = None) -> int:
+
+    args = vytvoreni_parseru().parse_args(argv)
+
+    format = "%(asctime)s: %(message)s"
+    uroven = logging.ERROR if args.tichy else logging.INFO
+    logging.basicConfig(format=format, level=uroven, datefmt="%H:%M:%S")
+
+    return args.funkce(args)
+
+
+# Hlavní vlákno skriptu
+if __name__ == "__main__":
+    sys.exit(main())
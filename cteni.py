@@ -2,8 +2,13 @@
 import logging
 import os
 import csv
-import json
-from typing import Any
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Iterator
+from mereni import zaznam_cteni
+from serializace import cteni_s_cache, nacteni
 
 
 class Cteni:
@@ -50,6 +55,86 @@ class Cteni:
         finally:
             return obsah
 
+    def cteni_csv_po_radcich(
+            self,
+            vstup: str,
+            kodovani: str,
+            oddelovac: str,
+            uvozovky: str = None
+        ) -> Iterator[list[str]]:
+        """
+        Generátor, který čte vstupní soubor s daty řádek po řádku,
+        takže se celý soubor nikdy nedrží v paměti
+
+        Args:
+            vstup: url s názvem vstupního souboru k načtení
+
+        Return:
+            jednotlivé řádky souboru včetně hlavičky
+        """
+        if not os.path.exists(vstup):
+            logging.info('Soubor s daty neexistuje.')
+            return
+
+        try:
+            with open(vstup, 'r', encoding=kodovani, newline='') as f:
+                yield from csv.reader(f, delimiter=oddelovac, quotechar=uvozovky)
+            zaznam_cteni(vstup)
+        except IOError:
+            logging.info('Nepodařilo se číst ze souboru s daty')
+
+    def seskupeni_katalogu(
+            self,
+            radky: Iterable[list[str]],
+            hlavicka: bool = True
+        ) -> dict[str, list[str]]:
+        """
+        Jedním průchodem zmenší písmo, vynechá hlavičku a prázdné
+        řádky a seskupí sloupce podle tabulek
+
+        Args:
+            radky: libovolný zdroj řádků [tabulka, sloupec]
+            hlavicka: vynechat řádky hlavičky tabulka;sloupec,
+                zdroje z databáze hlavičku nemají
+
+        Return:
+            slovník tabulka -> seznam sloupců v pořadí výskytu
+        """
+        katalog: dict[str, list[str]] = {}
+
+        for radek in radky:
+            if len(radek) < 2:
+                continue
+            # názvy se opakují napříč řádky i tabulkami,
+            # v paměti pak existují jen jednou
+            tabulka = sys.intern(radek[0].lower())
+            sloupec = sys.intern(radek[1].lower())
+            # hlavička souboru
+            if hlavicka and tabulka == 'tabulka':
+                continue
+            sloupce = katalog.setdefault(tabulka, [])
+            if not (hlavicka and sloupec == 'sloupec'):
+                sloupce.append(sloupec)
+
+        return katalog
+
+    def cteni_katalogu(
+            self,
+            vstup: str,
+            kodovani: str,
+            oddelovac: str,
+            uvozovky: str = None
+        ) -> dict[str, list[str]]:
+        """
+        Proudově načte katalog tabulek a sloupců přímo
+        do indexu tabulka -> sloupce
+        """
+        katalog = self.seskupeni_katalogu(
+            self.cteni_csv_po_radcich(vstup, kodovani, oddelovac, uvozovky)
+        )
+        logging.info('Katalog načtený')
+        return katalog
+
     def cteni_seznamu(self, 
             vstup: str, 
             kodovani: str = 'utf8',
@@ -73,29 +158,171 @@ class Cteni:
                 if uvozovky is not None:
                     data = [line.replace(uvozovky, '') for line in data]
                 s.close()
+                zaznam_cteni(vstup)
                 logging.info('Data načtená v pořádku')
         except IOError:
             logging.info('Nepodařilo se číst ze souboru s daty')
         finally:
             return data
         
-    def cteni_json(self, vstup: str) -> Any:
+    def cteni_json(self, vstup: str, cache: bool = False) -> Any:
         """
         Metoda načte JSON z textového souboru a vrátí 
         JSON objekt
 
         Args:
             vstup: cesta k souboru i s názvem a typem
+            cache: u velkých souborů se vedle uloží binární
+                cache, která se čte, dokud se soubor nezmění
 
         Returns:
             JSON objekt
         """
-        with open(vstup, 'r', encoding='utf8') as file:
+        if cache:
+            js = cteni_s_cache(vstup)
+            logging.info('Data JSON úspěšně načtená a zpracovaná.')
+            return js
+
+        with open(vstup, 'rb') as file:
             data = file.read()
+        zaznam_cteni(vstup, len(data))
 
         # Převod textu na Python objekt
-        js = json.loads(data)
+        js = nacteni(data)
 
         logging.info('Data JSON úspěšně načtená a zpracovaná.')
         return js
 
+
+class CachePoddotazu:
+
+    """
+    Omezená LRU cache načtených a znormalizovaných SQL poddotazů.
+    Záznam platí, dokud se nezmění čas změny a velikost souboru
+    ani souborů, na které odkazuje. Vnořený poddotaz se do textu
+    zapisuje jako {{soubor.sql}}, cesta je relativní k odkazujícímu
+    souboru
+    """
+    vnoreny = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+
+    def __init__(self, kapacita: int = 256) -> None:
+        if kapacita < 1:
+            raise ValueError(f'Kapacita cache poddotazů musí být aspoň 1: {kapacita}')
+        self.kapacita = kapacita
+        # cesta -> (mtime a velikost, text, závislosti)
+        self._polozky: OrderedDict[str, tuple] = OrderedDict()
+        self._zamek = threading.RLock()
+
+        self.zasahy = 0
+        self.minuti = 0
+        self.vyrazene = 0
+
+    def klic_souboru(self, cesta: str) -> tuple[int, int]:
+        st = os.stat(cesta)
+        return (st.st_mtime_ns, st.st_size)
+
+    def je_platna(self, polozka: tuple) -> bool:
+        """
+        Zjistí, zda se soubory záznamu od načtení nezměnily
+        """
+        try:
+            for cesta, klic in polozka[2]:
+                if self.klic_souboru(cesta) != klic:
+                    return False
+        except OSError:
+            return False
+        return True
+
+    def cteni(self, vstup: str, kodovani: str = 'utf8') -> str | None:
+        """
+        Vrací text poddotazu spojený do jednoho řádku,
+        s dosazenými vnořenými poddotazy
+        """
+        with self._zamek:
+            res = self._cteni(os.path.abspath(vstup), kodovani, ())
+        return None if res is None else res[0]
+
+    def _cteni(
+            self,
+            cesta: str,
+            kodovani: str,
+            otevrene: tuple[str, ...]
+        ) -> tuple[str, tuple] | None:
+        """
+        Vrací (text, závislosti), závislosti se vrací přímo,
+        záznam vnořeného poddotazu už nemusí být v cache
+        """
+        if cesta in otevrene:
+            logging.info(f'Poddotaz {cesta} odkazuje sám na sebe.')
+            return None
+
+        try:
+            klic = self.klic_souboru(cesta)
+        except OSError:
+            logging.info('Soubor s daty neexistuje.')
+            return None
+
+        polozka = self._polozky.get(cesta)
+        if polozka is not None and polozka[0] == klic and self.je_platna(polozka):
+            self.zasahy += 1
+            self._polozky.move_to_end(cesta)
+            return (polozka[1], polozka[2])
+
+        self.minuti += 1
+        zavislosti: list[tuple[str, tuple[int, int]]] = [(cesta, klic)]
+
+        try:
+            with open(cesta, 'r', encoding=kodovani) as s:
+                text = ' '.join(line.rstrip() for line in s)
+            zaznam_cteni(cesta, klic[1])
+        except IOError:
+            logging.info('Nepodařilo se číst ze souboru s daty')
+            return None
+
+        def dosazeni(shoda: re.Match) -> str:
+            vnorena = os.path.join(os.path.dirname(cesta), shoda.group(1))
+            vnorena = os.path.abspath(vnorena)
+            vnoreny = self._cteni(vnorena, kodovani, otevrene + (cesta,))
+            if vnoreny is None:
+                return shoda.group(0)
+            # závislosti vnořeného poddotazu platí i pro tento
+            zavislosti.extend(vnoreny[1])
+            return vnoreny[0]
+
+        text = self.vnoreny.sub(dosazeni, text)
+
+        res = (text, tuple(zavislosti))
+        self._polozky[cesta] = (klic,) + res
+        self._polozky.move_to_end(cesta)
+        while len(self._polozky) > self.kapacita:
+            self._polozky.popitem(last=False)
+            self.vyrazene += 1
+
+        return res
+
+    def zavislosti(self, vstup: str) -> list[str]:
+        """
+        Vrací cesty všech souborů, ze kterých se poddotaz složil
+        """
+        with self._zamek:
+            polozka = self._polozky.get(os.path.abspath(vstup))
+            if polozka is None:
+                return []
+            return list(dict.fromkeys(i[0] for i in polozka[2]))
+
+    def statistiky(self) -> dict[str, int]:
+        return {
+            'zasahy': self.zasahy,
+            'minuti': self.minuti,
+            'vyrazene': self.vyrazene,
+            'velikost': len(self._polozky),
+            'kapacita': self.kapacita
+        }
+
+    def vycisteni(self) -> None:
+        with self._zamek:
+            self._polozky.clear()
+
+
+# Cache sdílená všemi instancemi Jadro v jednom procesu
+cache_poddotazu = CachePoddotazu()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from cteni import Cteni
+from main import AUTOMATICKE_JOINY, FAZE, PARAMSTYLE, ULOZISTE
+from manifest import Manifest
+from query_builder import Jadro
+from uloziste import vytvoreni_uloziste
+from zapsani import Zapsani
+
+# Katalog sdílený procesy v poolu, nastaví se jednou při startu procesu
+_katalog: dict[str, list[str]] = {}
+_otisk_katalogu: str = ''
+
+
+def nastaveni_katalogu(katalog: dict[str, list[str]], otisk: str) -> None:
+    """
+    Inicializace procesu v poolu, katalog se tak do procesu
+    přenese jen jednou a ne s každým projektem
+    """
+    global _katalog, _otisk_katalogu
+    _katalog = katalog
+    _otisk_katalogu = otisk
+
+
+def hash_vystupu(cesta: str) -> str | None:
+    if not os.path.exists(cesta):
+        return None
+    return Manifest.hash_souboru(cesta)
+
+
+def sestaveni_projektu(
+        slozka: str,
+        pocet_vlaken: int = 1,
+        automaticke_joiny: bool = AUTOMATICKE_JOINY
+    ) -> tuple[str, str, str, str]:
+    """
+    Sestaví jeden projekt nad sdíleným katalogem
+
+    Returns:
+        (složka, stav, zpráva, otisk dotazu), stav je 'zmeneno',
+        'beze_zmeny', 'preskoceno' nebo 'chyba'
+    """
+    src = os.path.join(slozka, Jadro.slozka)
+    manifest = Manifest(
+        src,
+        otisk_katalogu=_otisk_katalogu,
+        nastaveni=Manifest.nastaveni_sestaveni(PARAMSTYLE, automaticke_joiny)
+    )
+
+    if manifest.je_aktualni():
+        return (slozka, 'preskoceno', '', manifest.otisk_dotazu)
+
+    vystup = os.path.join(src, 'output-select.sql')
+    puvodni = hash_vystupu(vystup)
+
+    try:
+        uloziste = vytvoreni_uloziste(ULOZISTE, src)
+        try:
+            jadro = Jadro(slozka, manifest, pocet_vlaken, uloziste, _katalog)
+            jadro.automaticke_joiny = automaticke_joiny
+            jadro.paramstyle = PARAMSTYLE
+            for faze in FAZE:
+                getattr(jadro, faze)()
+        finally:
+            uloziste.uzavreni()
+    except Exception as e:
+        return (slozka, 'chyba', f'{type(e).__name__}: {e}', '')
+
+    if jadro.chyby:
+        return (slozka, 'chyba', f'Chyby u tabulek: {", ".join(sorted(jadro.chyby))}', '')
+
+    if hash_vystupu(vystup) != puvodni:
+        return (slozka, 'zmeneno', '', manifest.otisk_dotazu)
+    return (slozka, 'beze_zmeny', '', manifest.otisk_dotazu)
+
+
+def seznam_projektu(vzory: list[str]) -> list[str]:
+    """
+    Rozbalí zadané složky a vzory glob na seznam projektů,
+    projektem je složka, která obsahuje podsložku src
+    """
+    res: dict[str, None] = {}
+    for vzor in vzory:
+        for slozka in sorted(glob.glob(vzor)) or [vzor]:
+            if os.path.isdir(os.path.join(slozka, Jadro.slozka)):
+                res[os.path.abspath(slozka)] = None
+            else:
+                logging.info(f'Složka {slozka} není projekt.')
+    return list(res)
+
+
+def zapsani_pohledu(slozka: str, duplicity: dict[str, list[str]]) -> None:
+    """
+    Pro každou skupinu projektů se stejným dotazem zapíše do složky
+    sdílený pohled v_<otisk>.sql s dotazem prvního projektu.
+    Dotazy s parametry pohled mít nemůžou, stačí jim otisk
+    jako klíč cache
+    """
+    os.makedirs(slozka, exist_ok=True)
+    z = Zapsani(slozka, jen_zmeny=True)
+
+    for otisk, projekty in duplicity.items():
+        src = os.path.join(projekty[0], Jadro.slozka)
+        if os.path.exists(os.path.join(src, 'output-parametry.json')):
+            continue
+        with open(os.path.join(src, 'output-select.sql'), 'r', encoding='utf8') as f:
+            sql = f.read().rstrip()
+        nazev = f'v_{otisk[:16]}'
+        zdroje = ''.join(f'-- {i}\n' for i in projekty)
+        z.zapsani_textu(z.vystupni_soubor(f'{nazev}.sql'), f'{zdroje}create view {nazev} as\n{sql};\n')
+
+
+def davkove_sestaveni(
+        vzory: list[str],
+        soubor_katalogu: str,
+        pocet_procesu: int | None = None,
+        pocet_vlaken: int = 1,
+        slozka_pohledu: str | None = None,
+        automaticke_joiny: bool = AUTOMATICKE_JOINY
+    ) -> dict[str, Any]:
+    """
+    Načte sdílený katalog jednou a sestaví všechny projekty
+    paralelně v poolu procesů
+
+    Returns:
+        přehled projektů podle výsledku sestavení
+    """
+    projekty = seznam_projektu(vzory)
+
+    n = Cteni(os.path.dirname(soubor_katalogu))
+    katalog = n.cteni_katalogu(soubor_katalogu, 'utf8', ';', '"')
+    otisk = Manifest.hash_souboru(soubor_katalogu)
+
+    souhrn: dict[str, Any] = {
+        'zmeneno': [],
+        'beze_zmeny': [],
+        'preskoceno': [],
+        'chyby': {},
+        # projekt -> otisk dotazu, klíč pro cache výsledků
+        'otisky': {},
+        # otisk -> projekty se stejným dotazem
+        'duplicity': {}
+    }
+
+    with ProcessPoolExecutor(
+            max_workers=pocet_procesu,
+            initializer=nastaveni_katalogu,
+            initargs=(katalog, otisk)
+        ) as ex:
+        vysledky = ex.map(
+            sestaveni_projektu,
+            projekty,
+            [pocet_vlaken] * len(projekty),
+            [automaticke_joiny] * len(projekty)
+        )
+
+        for slozka, stav, zprava, otisk in vysledky:
+            if stav == 'chyba':
+                souhrn['chyby'][slozka] = zprava
+            else:
+                souhrn[stav].append(slozka)
+            if otisk:
+                souhrn['otisky'][slozka] = otisk
+
+    skupiny: dict[str, list[str]] = {}
+    for slozka, otisk in souhrn['otisky'].items():
+        skupiny.setdefault(otisk, []).append(slozka)
+    souhrn['duplicity'] = {k: v for k, v in skupiny.items() if len(v) > 1}
+
+    if slozka_pohledu and souhrn['duplicity']:
+        zapsani_pohledu(slozka_pohledu, souhrn['duplicity'])
+
+    logging.info(
+        f'Projektů: {len(projekty)}, změněno: {len(souhrn["zmeneno"])}, '
+        f'přeskočeno: {len(souhrn["preskoceno"])}, chyby: {len(souhrn["chyby"])}, '
+        f'skupin stejných dotazů: {len(souhrn["duplicity"])}'
+    )
+    return souhrn
+
+
+# Hlavní metoda skriptu
+def main() -> int:
+
+    parser = argparse.ArgumentParser(
+        description='Sestavení SQL pro víc projektů nad jedním katalogem'
+    )
+    parser.add_argument('katalog', help='cesta ke sdílenému souboru sloupce.csv')
+    parser.add_argument('projekty', nargs='+', help='složky projektů nebo vzory glob')
+    parser.add_argument('--procesy', type=int, default=None)
+    parser.add_argument('--vlakna', type=int, default=1)
+    parser.add_argument('--pohledy', default=None, help='složka pro sdílené pohledy stejných dotazů')
+    parser.add_argument(
+        '--automaticke-joiny', action='store_true',
+        help='dohledat chybějící joiny vybraných tabulek po klíčových sloupcích *_id'
+    )
+    args = parser.parse_args()
+
+    format = "%(asctime)s: %(message)s"
+    logging.basicConfig(format=format, level=logging.WARNING, datefmt="%H:%M:%S")
+
+    souhrn = davkove_sestaveni(
+        args.projekty,
+        args.katalog,
+        args.procesy,
+        args.vlakna,
+        args.pohledy,
+        args.automaticke_joiny or AUTOMATICKE_JOINY
+    )
+    print(json.dumps(souhrn, ensure_ascii=False, indent=4))
+
+    return 1 if souhrn['chyby'] else 0
+
+
+# Hlavní vlákno skriptu
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+import hashlib
+import io
+import json
+import re
+from functools import lru_cache
+from typing import Any, Self
+
+MEZERA = '    '
+
+# Literály v hodnotě podmínky, které se dají nahradit parametrem
+_CISLO = r'[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?'
+_RETEZEC = r"'(?:[^']|'')*'"
+_LITERAL = f'(?:{_CISLO}|{_RETEZEC})'
+LITERAL = re.compile(_LITERAL)
+SEZNAM_LITERALU = re.compile(rf'\(\s*{_LITERAL}(?:\s*,\s*{_LITERAL})*\s*\)')
+ROZSAH_LITERALU = re.compile(rf'({_LITERAL})\s+and\s+({_LITERAL})', re.IGNORECASE)
+# Text rozdělený na části mimo řetězce a řetězcové literály
+MIMO_RETEZCE = re.compile(f'({_RETEZEC})')
+BILE_ZNAKY = re.compile(r'\s+')
+# Zástupné znaky všech stylů, v kanonickém tvaru se sjednotí na ?
+ZASTUPNY_ZNAK = re.compile(r'\?|:\w+|%s|%\(\w+\)s')
+# Styly, ve kterých se jeden parametr nedá v textu použít dvakrát
+POZICNI_STYLY = ('qmark', 'format')
+
+
+def zastupny_znak(paramstyle: str, poradi: int) -> str:
+    """
+    Vrací zástupný znak parametru s daným pořadím od 1,
+    pojmenované parametry se jmenují p1, p2...
+    """
+    if paramstyle == 'qmark':
+        return '?'
+    if paramstyle == 'numeric':
+        return f':{poradi}'
+    if paramstyle == 'named':
+        return f':p{poradi}'
+    if paramstyle == 'format':
+        return '%s'
+    if paramstyle == 'pyformat':
+        return f'%(p{poradi})s'
+    raise ValueError(f'Neznámý paramstyle: {paramstyle}')
+
+
+def bez_mezer(text: str) -> str:
+    """
+    Sloučí bílé znaky do jedné mezery, řetězcové literály
+    zůstanou tak, jak jsou zapsané
+    """
+    casti = MIMO_RETEZCE.split(text)
+    return ''.join(
+        cast if i % 2 else BILE_ZNAKY.sub(' ', cast) for i, cast in enumerate(casti)
+    ).strip()
+
+
+def hodnota_literalu(literal: str) -> Any:
+    """
+    Převede SQL literál na hodnotu parametru
+    """
+    if literal.startswith("'"):
+        return literal[1:-1].replace("''", "'")
+    try:
+        return int(literal)
+    except ValueError:
+        return float(literal)
+
+
+def parametrizace(
+        operator: str,
+        hodnota: Any,
+        paramstyle: str,
+        zacatek: int
+    ) -> tuple[str, list[Any]]:
+    """
+    Nahradí literály v hodnotě podmínky zástupnými znaky.
+    Jde to u jednoho literálu, u seznamu literálů za in
+    a u dvou literálů za between, jiné hodnoty jako sloupce,
+    funkce nebo null zůstanou v textu. Hodnota, která v JSON
+    není řetězec, např. číslo, se předá rovnou jako parametr
+
+    Args:
+        operator: operátor podmínky
+        hodnota: hodnota podmínky, jak je v celkovém schématu
+        paramstyle: styl zástupných znaků
+        zacatek: pořadí prvního parametru
+
+    Returns:
+        (text hodnoty se zástupnými znaky, hodnoty parametrů)
+    """
+    if not isinstance(hodnota, str):
+        return zastupny_znak(paramstyle, zacatek), [hodnota]
+
+    text = hodnota.strip()
+    op = ' '.join(operator.lower().split())
+
+    if LITERAL.fullmatch(text):
+        literaly = [text]
+        vzor = '{}'
+    elif op in ('in', 'not in') and SEZNAM_LITERALU.fullmatch(text):
+        literaly = LITERAL.findall(text)
+        vzor = '(' + ', '.join('{}' for _ in literaly) + ')'
+    elif op in ('between', 'not between') and ROZSAH_LITERALU.fullmatch(text):
+        literaly = list(ROZSAH_LITERALU.fullmatch(text).groups())
+        vzor = '{} and {}'
+    else:
+        return hodnota, []
+
+    znaky = [zastupny_znak(paramstyle, zacatek + i) for i in range(len(literaly))]
+    return vzor.format(*znaky), [hodnota_literalu(i) for i in literaly]
+
+
+def klic_hodnot(hodnota: Any) -> Any:
+    """
+    Klíč pro cache uzlů, který rozliší i typ hodnot, i uvnitř
+    n-tic. Jinak by 1, 1.0 a True byly stejný klíč a vrátil
+    by se uzel s jinak vykreslenou hodnotou
+    """
+    if isinstance(hodnota, tuple):
+        return (tuple, tuple(klic_hodnot(i) for i in hodnota))
+    return (type(hodnota), hodnota)
+
+
+@lru_cache(maxsize=1 << 17)
+def _sdileny_uzel(cls: type, klic: Any, args: tuple[Any, ...]) -> Any:
+    return cls(*args)
+
+
+class Uzel:
+
+    """
+    Základní uzel modelu dotazu. Uzly jsou neměnné, svůj vykreslený
+    text si pamatují a přes vytvor() se stejný uzel vytvoří jen jednou,
+    takže dotazy lišící se jednou částí sdílí všechny ostatní
+    """
+    __slots__ = ('_text',)
+
+    def __init__(self) -> None:
+        self._text: str | None = None
+
+    @classmethod
+    def vytvor(cls, *args: Any) -> Self:
+        """
+        Vrací sdílený uzel pro zadané hodnoty
+        """
+        return _sdileny_uzel(cls, klic_hodnot(args), args)
+
+    def vykresleni(self) -> str:
+        """
+        Vrací text uzlu, vykreslí se jen poprvé
+        """
+        if self._text is None:
+            buf = io.StringIO()
+            self.zapis(buf)
+            self._text = buf.getvalue()
+        return self._text
+
+    def zapis(self, buf: io.StringIO) -> None:
+        raise NotImplementedError
+
+
+class Sloupec(Uzel):
+
+    """
+    Položka v klauzuli select, případně s agregací a aliasem
+    """
+    __slots__ = ('nazev', 'agg', 'alias')
+
+    def __init__(self, nazev: str, agg: str = '', alias: str = '') -> None:
+        super().__init__()
+        self.nazev = nazev
+        self.agg = agg
+        self.alias = alias
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if self.agg:
+            buf.write(f'{self.agg}({self.nazev})')
+        else:
+            buf.write(self.nazev)
+        if self.alias:
+            buf.write(f' as {self.alias}')
+
+
+class Podminka(Uzel):
+
+    """
+    Jedna podmínka klauzule where: sloupec, operátor, hodnota,
+    u parametrizované podmínky jsou v hodnotě zástupné znaky
+    a hodnoty parametrů v parametry. Hodnota může být v JSON
+    i číslo, ukládá se jako text
+    """
+    __slots__ = ('sloupec', 'operator', 'hodnota', 'parametry')
+
+    def __init__(
+            self,
+            sloupec: str,
+            operator: str,
+            hodnota: Any,
+            parametry: tuple[Any, ...] = ()
+        ) -> None:
+        super().__init__()
+        self.sloupec = sloupec
+        self.operator = operator
+        self.hodnota = str(hodnota)
+        self.parametry = parametry
+
+    def kanonicky_tvar(self) -> str:
+        hodnota = bez_mezer(self.hodnota)
+        if self.parametry:
+            hodnota = ZASTUPNY_ZNAK.sub('?', hodnota)
+            hodnota += ' ' + json.dumps(self.parametry, ensure_ascii=False)
+        return f'{self.sloupec} {bez_mezer(self.operator).lower()} {hodnota}'
+
+    def zapis(self, buf: io.StringIO) -> None:
+        buf.write(f'{self.sloupec} {self.operator} {self.hodnota}')
+
+
+class Zdroj(Uzel):
+
+    """
+    Tabulka v klauzuli from, nebo poddotaz s aliasem
+    """
+    __slots__ = ('nazev', 'poddotaz')
+
+    def __init__(self, nazev: str, poddotaz: str = '') -> None:
+        super().__init__()
+        self.nazev = nazev
+        self.poddotaz = str(poddotaz)
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if self.poddotaz:
+            buf.write(f'({self.poddotaz}) ')
+        buf.write(self.nazev)
+
+    def kanonicky_tvar(self) -> str:
+        if self.poddotaz:
+            return f'({bez_mezer(self.poddotaz)}) {self.nazev}'
+        return self.nazev
+
+
+class Join(Uzel):
+
+    """
+    Jeden řádek s napojením tabulky nebo poddotazu,
+    např. left join datumy on datumy.datum_id = prodeje.datum_id
+    """
+    __slots__ = ('typ', 'zdroj', 'zbytek')
+
+    def __init__(self, typ: str, zdroj: Zdroj, zbytek: str = '') -> None:
+        super().__init__()
+        self.typ = typ
+        self.zdroj = zdroj
+        self.zbytek = str(zbytek)
+
+    def zapis(self, buf: io.StringIO) -> None:
+        buf.write(f'{self.typ} ')
+        buf.write(self.zdroj.vykresleni())
+        if self.zbytek:
+            buf.write(f' {self.zbytek}')
+
+    def kanonicky_tvar(self) -> str:
+        return bez_mezer(f'{self.typ.lower()} {self.zdroj.kanonicky_tvar()} {self.zbytek}')
+
+
+class Vyber(Uzel):
+
+    """
+    Klauzule select, nejdříve čisté sloupce a potom agregace
+    """
+    __slots__ = ('polozky',)
+
+    def __init__(self, polozky: tuple[Sloupec, ...]) -> None:
+        super().__init__()
+        self.polozky = polozky
+
+    def zapis(self, buf: io.StringIO) -> None:
+        buf.write('select\n')
+        for poradi, polozka in enumerate(self.polozky):
+            if poradi:
+                buf.write(',\n')
+            buf.write(MEZERA)
+            buf.write(polozka.vykresleni())
+        buf.write('\n')
+
+
+class Od(Uzel):
+
+    """
+    Klauzule from s výchozí tabulkou a joiny
+    """
+    __slots__ = ('zdroj', 'joiny')
+
+    def __init__(self, zdroj: Zdroj, joiny: tuple[Join, ...]) -> None:
+        super().__init__()
+        self.zdroj = zdroj
+        self.joiny = joiny
+
+    def zapis(self, buf: io.StringIO) -> None:
+        buf.write('from ')
+        buf.write(self.zdroj.vykresleni())
+        buf.write('\n')
+        for join in self.joiny:
+            buf.write(join.vykresleni())
+            buf.write('\n')
+
+
+class Kde(Uzel):
+
+    """
+    Klauzule where, bez podmínek se nevykreslí
+    """
+    __slots__ = ('podminky',)
+
+    def __init__(self, podminky: tuple[Podminka, ...]) -> None:
+        super().__init__()
+        self.podminky = podminky
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if not self.podminky:
+            return
+        buf.write('where 1=1 \n')
+        for podminka in self.podminky:
+            buf.write('and ')
+            buf.write(podminka.vykresleni())
+            buf.write('\n')
+
+
+class Seskupeni(Uzel):
+
+    """
+    Klauzule group by, bez sloupců se nevykreslí
+    """
+    __slots__ = ('sloupce',)
+
+    def __init__(self, sloupce: tuple[str, ...]) -> None:
+        super().__init__()
+        self.sloupce = sloupce
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if not self.sloupce:
+            return
+        buf.write('group by \n')
+        buf.write(MEZERA)
+        buf.write(f',\n{MEZERA}'.join(self.sloupce))
+        buf.write('\n')
+
+
+class Razeni(Uzel):
+
+    """
+    Klauzule order by s dvojicemi (výraz, směr),
+    bez sloupců se nevykreslí
+    """
+    __slots__ = ('sloupce',)
+
+    def __init__(self, sloupce: tuple[tuple[str, str], ...]) -> None:
+        super().__init__()
+        self.sloupce = sloupce
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if not self.sloupce:
+            return
+        buf.write('order by \n')
+        buf.write(MEZERA)
+        buf.write(f',\n{MEZERA}'.join(
+            f'{vyraz} {smer}' if smer == 'desc' else vyraz for vyraz, smer in self.sloupce
+        ))
+        buf.write('\n')
+
+
+class Omezeni(Uzel):
+
+    """
+    Klauzule limit, bez počtu řádků se nevykreslí
+    """
+    __slots__ = ('pocet',)
+
+    def __init__(self, pocet: int = 0) -> None:
+        super().__init__()
+        self.pocet = pocet
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if self.pocet:
+            buf.write(f'limit {self.pocet}\n')
+
+
+class PodminkaKurzoru(Uzel):
+
+    """
+    Podmínka další stránky při stránkování kurzorem (seek method):
+    řádky, které jsou v pořadí order by až za posledním řádkem
+    předchozí stránky. Při stejném směru všech sloupců se použije
+    porovnání řádkových hodnot, které databáze umí vyhodnotit
+    přes složený index, při různých směrech rozepsaná podmínka
+    """
+    __slots__ = ('sloupce', 'smery', 'znaky')
+
+    def __init__(
+            self,
+            sloupce: tuple[str, ...],
+            smery: tuple[str, ...],
+            znaky: tuple[str, ...]
+        ) -> None:
+        super().__init__()
+        self.sloupce = sloupce
+        self.smery = smery
+        self.znaky = znaky
+
+    @staticmethod
+    def operator(smer: str) -> str:
+        return '<' if smer == 'desc' else '>'
+
+    def stejny_smer(self) -> bool:
+        return len(set(self.smery)) == 1
+
+    def poradi_parametru(self) -> list[int]:
+        """
+        Vrací indexy sloupců kurzoru v pořadí, ve kterém jsou
+        zástupné znaky v textu podmínky, u rozepsané podmínky
+        se sloupce opakují
+        """
+        if self.stejny_smer():
+            return list(range(len(self.sloupce)))
+        res = []
+        for i in range(len(self.sloupce)):
+            res += range(i + 1)
+        return res
+
+    def zapis(self, buf: io.StringIO) -> None:
+        if self.stejny_smer():
+            op = self.operator(self.smery[0])
+            if len(self.sloupce) == 1:
+                buf.write(f'{self.sloupce[0]} {op} {self.znaky[0]}')
+            else:
+                buf.write(f'({", ".join(self.sloupce)}) {op} ({", ".join(self.znaky)})')
+            return
+
+        # (a > ?) or (a = ? and b < ?) or ...
+        casti = []
+        for i, sloupec in enumerate(self.sloupce):
+            rovnosti = [f'{self.sloupce[j]} = {self.znaky[j]}' for j in range(i)]
+            rovnosti.append(f'{sloupec} {self.operator(self.smery[i])} {self.znaky[i]}')
+            casti.append('(' + ' and '.join(rovnosti) + ')')
+        buf.write('(' + ' or '.join(casti) + ')')
+
+    def kanonicky_tvar(self) -> str:
+        return ZASTUPNY_ZNAK.sub('?', self.vykresleni())
+
+    @classmethod
+    def sestaveni(
+            cls,
+            sloupce: list[str],
+            smery: list[str],
+            paramstyle: str,
+            zacatek: int
+        ) -> Self:
+        """
+        Sestaví podmínku s jedním zástupným znakem na sloupec,
+        číslovanou od pořadí zacatek
+        """
+        znaky = [zastupny_znak(paramstyle, zacatek + i) for i in range(len(sloupce))]
+        return cls.vytvor(tuple(sloupce), tuple(smery), tuple(znaky))
+
+
+class Dotaz(Uzel):
+
+    """
+    Celý dotaz select složený z jednotlivých klauzulí
+    """
+    __slots__ = ('vyber', 'od', 'kde', 'seskupeni', 'razeni', 'omezeni')
+
+    def __init__(
+            self,
+            vyber: Vyber,
+            od: Od,
+            kde: Kde,
+            seskupeni: Seskupeni,
+            razeni: Razeni | None = None,
+            omezeni: Omezeni | None = None
+        ) -> None:
+        super().__init__()
+        self.vyber = vyber
+        self.od = od
+        self.kde = kde
+        self.seskupeni = seskupeni
+        self.razeni = razeni or Razeni.vytvor(())
+        self.omezeni = omezeni or Omezeni.vytvor(0)
+
+    def zapis(self, buf: io.StringIO) -> None:
+        for klauzule in (self.vyber, self.od, self.kde, self.seskupeni, self.razeni, self.omezeni):
+            buf.write(klauzule.vykresleni())
+
+    def dalsi_stranka(self, podminka: PodminkaKurzoru) -> Self:
+        """
+        Vrací dotaz na další stránku, od tohoto se liší jen
+        podmínkou kurzoru ve where, ostatní klauzule sdílí
+        """
+        return self.vytvor(
+            self.vyber,
+            self.od,
+            Kde.vytvor(self.kde.podminky + (podminka,)),
+            self.seskupeni,
+            self.razeni,
+            self.omezeni
+        )
+
+    def kanonicky_tvar(self) -> str:
+        """
+        Tvar dotazu, který nezávisí na bílých znacích, aliasech
+        sloupců, pořadí sloupců v group by ani pořadí podmínek
+        where. Dotazy se stejným tvarem vrací stejná data,
+        liší se nanejvýš názvy sloupců výsledku
+        """
+        polozky = []
+        for polozka in self.vyber.polozky:
+            polozky.append(f'{polozka.agg.lower()}({polozka.nazev})' if polozka.agg else polozka.nazev)
+
+        casti = [
+            'select ' + ', '.join(polozky),
+            'from ' + self.od.zdroj.kanonicky_tvar()
+        ]
+        casti += [i.kanonicky_tvar() for i in self.od.joiny]
+        if self.kde.podminky:
+            casti.append('where ' + ' and '.join(sorted(i.kanonicky_tvar() for i in self.kde.podminky)))
+        if self.seskupeni.sloupce:
+            casti.append('group by ' + ', '.join(sorted(set(self.seskupeni.sloupce))))
+        # na pořadí sloupců order by záleží
+        if self.razeni.sloupce:
+            casti.append('order by ' + ', '.join(f'{v} {s}' for v, s in self.razeni.sloupce))
+        if self.omezeni.pocet:
+            casti.append(f'limit {self.omezeni.pocet}')
+        return '\n'.join(casti)
+
+    def otisk(self) -> str:
+        """
+        Stabilní otisk kanonického tvaru dotazu, slouží jako
+        klíč cache výsledků a k hledání duplicitních dotazů
+        """
+        return hashlib.sha256(self.kanonicky_tvar().encode('utf8')).hexdigest()
+
+    @classmethod
+    def sestaveni(
+            cls,
+            sloupce: list[Sloupec],
+            agregace: list[Sloupec],
+            zdroj: Zdroj,
+            joiny: list[Join],
+            podminky: list[Podminka],
+            group_by: list[str],
+            razeni: list[tuple[str, str]] | None = None,
+            limit: int = 0
+        ) -> Self:
+        """
+        Sestaví dotaz z jeho částí, group by se použije
+        jen tehdy, když je v dotazu nějaká agregace
+        """
+        return cls.vytvor(
+            Vyber.vytvor(tuple(sloupce) + tuple(agregace)),
+            Od.vytvor(zdroj, tuple(joiny)),
+            Kde.vytvor(tuple(podminky)),
+            Seskupeni.vytvor(tuple(group_by) if agregace else ()),
+            Razeni.vytvor(tuple(razeni or ())),
+            Omezeni.vytvor(limit)
+        )
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import logging
+from collections import deque
+from typing import Any, Self
+
+
+class UzelTabulky:
+
+    """
+    Tabulka nebo poddotaz v grafu joinů. U výchozí tabulky
+    platí i nepovinné klíče limit, tedy počet řádků stránky,
+    a kurzor, tedy sloupce pro stránkování kurzorem
+    """
+    __slots__ = ('nazev', 'vychozi', 'je_poddotaz', 'sql', 'poddotaz', 'limit', 'kurzor')
+
+    def __init__(
+            self,
+            nazev: str,
+            vychozi: bool = False,
+            je_poddotaz: bool = False,
+            sql: str = '',
+            limit: int = 0,
+            kurzor: tuple[str, ...] = ()
+        ) -> None:
+        self.nazev = nazev
+        self.vychozi = vychozi
+        self.je_poddotaz = je_poddotaz
+        # název souboru s SQL a jeho načtený text
+        self.sql = sql
+        self.poddotaz = ''
+        self.limit = limit
+        self.kurzor = kurzor
+
+
+class Hrana:
+
+    """
+    Napojení cílové tabulky, např. typ 'left join', cíl 'datumy'
+    a zbytek 'on datumy.datum_id = prodeje.datum_id'
+    """
+    __slots__ = ('zdroj', 'typ', 'cil', 'zbytek')
+
+    def __init__(self, zdroj: str, typ: str, cil: str, zbytek: str) -> None:
+        self.zdroj = zdroj
+        self.typ = typ
+        self.cil = cil
+        self.zbytek = zbytek
+
+
+class GrafJoinu:
+
+    """
+    Graf tabulek a jejich napojení, sestavený jednou z joiny.txt.
+    Poddotazy se dosazují podle cílového uzlu hrany, ne hledáním
+    názvu v textu
+    """
+    def __init__(self) -> None:
+        self.uzly: dict[str, UzelTabulky] = {}
+        self.hrany: list[Hrana] = []
+        # tabulka -> {sousední tabulka: společný klíčový sloupec}
+        self.klice: dict[str, dict[str, str]] = {}
+
+    @classmethod
+    def z_definice(cls, joiny: dict[str, Any]) -> Self:
+        """
+        Sestaví graf z definice joinů ve tvaru joiny.txt
+        """
+        graf = cls()
+
+        for nazev, definice in joiny.items():
+            graf.uzly[nazev] = UzelTabulky(
+                nazev,
+                definice.get('vychozi') == 1,
+                definice.get('je_poddotaz') == 1,
+                definice.get('sql') or '',
+                definice.get('limit') or 0,
+                tuple(dict.fromkeys(i for i in definice.get('kurzor') or () if i))
+            )
+
+            vazby = definice.get('vazba')
+            if not isinstance(vazby, list):
+                continue
+
+            for vazba in vazby:
+                if len(vazba) < 2 or not (vazba[0] or vazba[1]):
+                    continue
+                # první slovo vazby je napojovaná tabulka
+                casti = vazba[1].split(None, 1)
+                cil = casti[0] if casti else ''
+                zbytek = casti[1] if len(casti) > 1 else ''
+                graf.hrany.append(Hrana(nazev, vazba[0], cil, zbytek))
+
+        return graf
+
+    def vychozi(self) -> UzelTabulky | None:
+        """
+        Vrací výchozí tabulku, u více označených tu poslední
+        """
+        res = None
+        for uzel in self.uzly.values():
+            if uzel.vychozi:
+                res = uzel
+        return res
+
+    def poddotazy(self) -> list[UzelTabulky]:
+        """
+        Vrací uzly, které jsou poddotazem s uvedeným SQL souborem
+        """
+        res = []
+        for uzel in self.uzly.values():
+            if uzel.je_poddotaz:
+                if uzel.sql:
+                    res.append(uzel)
+                else:
+                    logging.info('Není odkaz s SQL příkazem')
+        return res
+
+    def pridani_klicu(
+            self,
+            katalog: dict[str, list[str]],
+            pripona: str = '_id'
+        ) -> None:
+        """
+        Z katalogu doplní hrany pro automatické hledání cest.
+        Klíčem je sloupec s danou příponou, který má víc tabulek
+        """
+        tabulky_sloupce: dict[str, list[str]] = {}
+        for tabulka, sloupce in katalog.items():
+            for sloupec in sloupce:
+                if sloupec.endswith(pripona):
+                    tabulky_sloupce.setdefault(sloupec, []).append(tabulka)
+
+        for sloupec, tabulky in tabulky_sloupce.items():
+            for a in tabulky:
+                for b in tabulky:
+                    if a != b:
+                        self.klice.setdefault(a, {}).setdefault(b, sloupec)
+
+    def doplneni_cest(self, pripojene: list[str], cile: list[str]) -> list[Hrana]:
+        """
+        Najde nejkratší cesty po klíčích od již připojených tabulek
+        ke zbylým cílovým tabulkám a vrací chybějící hrany v pořadí,
+        ve kterém se mají připojit
+        """
+        spojene = dict.fromkeys(pripojene)
+        res: list[Hrana] = []
+
+        for cil in cile:
+            if cil in spojene:
+                continue
+
+            # prohledání do šířky od všech připojených tabulek
+            predchozi: dict[str, str | None] = dict.fromkeys(spojene)
+            fronta = deque(spojene)
+            while fronta and cil not in predchozi:
+                tabulka = fronta.popleft()
+                for soused in self.klice.get(tabulka, {}):
+                    if soused not in predchozi:
+                        predchozi[soused] = tabulka
+                        fronta.append(soused)
+
+            if cil not in predchozi:
+                logging.info(f'Tabulku {cil} nelze automaticky napojit.')
+                continue
+
+            cesta = []
+            uzel = cil
+            while predchozi[uzel] is not None:
+                cesta.append((predchozi[uzel], uzel))
+                uzel = predchozi[uzel]
+
+            for zdroj, tabulka in reversed(cesta):
+                k = self.klice[zdroj][tabulka]
+                res.append(Hrana(
+                    zdroj,
+                    'left join',
+                    tabulka,
+                    f'on {tabulka}.{k} = {zdroj}.{k}'
+                ))
+                spojene[tabulka] = None
+
+        return res
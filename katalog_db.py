@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import logging
+from typing import Any, Iterator, Sequence
+from cteni import Cteni
+
+# Počet řádků, které se z kurzoru načtou najednou
+VELIKOST_DAVKY = 5000
+
+# Zástupný znak parametru schema podle paramstyle z DB-API
+ZASTUPNE_ZNAKY = {
+    'qmark': '?',
+    'numeric': ':1',
+    'named': ':schema',
+    'format': '%s',
+    'pyformat': '%(schema)s',
+}
+
+
+def radky_kurzoru(kurzor: Any, velikost_davky: int = VELIKOST_DAVKY) -> Iterator[Sequence[Any]]:
+    """
+    Proudově vrací řádky kurzoru, z databáze se čtou
+    po dávkách přes fetchmany
+    """
+    while True:
+        davka = kurzor.fetchmany(velikost_davky)
+        if not davka:
+            return
+        yield from davka
+
+
+class DbZdroj:
+
+    """
+    Zdroj katalogu z připojení DB-API, dotaz vrací řádky
+    (tabulka, sloupec) seřazené podle tabulky a pořadí sloupce
+    """
+    def __init__(self, spojeni: Any, velikost_davky: int = VELIKOST_DAVKY) -> None:
+        self.spojeni = spojeni
+        self.velikost_davky = velikost_davky
+
+    def dotaz(self) -> str:
+        raise NotImplementedError
+
+    def parametry(self) -> Sequence[Any] | dict[str, Any]:
+        return ()
+
+    def radky(self) -> Iterator[Sequence[Any]]:
+        """
+        Spustí dotaz a proudově vrací jeho řádky
+        """
+        kurzor = self.spojeni.cursor()
+        try:
+            kurzor.execute(self.dotaz(), self.parametry())
+            yield from radky_kurzoru(kurzor, self.velikost_davky)
+        finally:
+            kurzor.close()
+
+
+class SqliteZdroj(DbZdroj):
+
+    """
+    Katalog lokální SQLite databáze z pragma_table_info,
+    jedním dotazem pro všechny tabulky a pohledy
+    """
+    def dotaz(self) -> str:
+        return (
+            "select m.name, p.name "
+            "from sqlite_master m, pragma_table_info(m.name) p "
+            "where m.type in ('table', 'view') "
+            "and m.name not like 'sqlite\\_%' escape '\\' "
+            "order by m.name, p.cid"
+        )
+
+
+class InformationSchemaZdroj(DbZdroj):
+
+    """
+    Katalog databáze se standardním information_schema.columns,
+    paramstyle je hodnota stejnojmenného atributu modulu ovladače
+    """
+    def __init__(
+            self,
+            spojeni: Any,
+            schema: str = 'public',
+            paramstyle: str = 'format',
+            velikost_davky: int = VELIKOST_DAVKY
+        ) -> None:
+        super().__init__(spojeni, velikost_davky)
+        if paramstyle not in ZASTUPNE_ZNAKY:
+            raise ValueError(f'Neznámý paramstyle: {paramstyle}')
+        self.schema = schema
+        self.paramstyle = paramstyle
+
+    def dotaz(self) -> str:
+        return (
+            "select table_name, column_name "
+            "from information_schema.columns "
+            f"where table_schema = {ZASTUPNE_ZNAKY[self.paramstyle]} "
+            "order by table_name, ordinal_position"
+        )
+
+    def parametry(self) -> Sequence[Any] | dict[str, Any]:
+        if self.paramstyle in ('named', 'pyformat'):
+            return {'schema': self.schema}
+        return (self.schema,)
+
+
+def nacteni_katalogu(zdroj: DbZdroj) -> dict[str, list[str]]:
+    """
+    Načte katalog ze zdroje rovnou do indexu tabulka -> sloupce,
+    stejného jako při čtení sloupce.csv, takže se dá předat
+    do Jadro(katalog=...)
+    """
+    katalog = Cteni('').seskupeni_katalogu(zdroj.radky(), hlavicka=False)
+    logging.info(f'Katalog načtený z databáze, počet tabulek: {len(katalog)}')
+    return katalog
@@ -1,11 +1,103 @@
 #!/usr/bin/env python3
 import logging
 import os
+import sys
+from manifest import Manifest
+from mereni import Mereni
 from query_builder import Jadro
+from uloziste import vytvoreni_uloziste
+
+# Počet vláken pro čtení a zápis schémat jednotlivých tabulek
+POCET_VLAKEN = 8
+# Úložiště schémat tabulek: 'soubory' nebo 'sqlite'
+ULOZISTE = 'soubory'
+# Dohledání chybějících joinů vybraných tabulek po klíčových sloupcích,
+# ve výchozím stavu vypnuté, protože napojení dvou tabulek faktů přes
+# společný klíč násobí řádky a tím i hodnoty agregací
+AUTOMATICKE_JOINY = False
+# Styl zástupných znaků pro hodnoty podmínek podle DB-API:
+# 'qmark', 'numeric', 'named', 'format' nebo 'pyformat',
+# None zapisuje hodnoty přímo do textu dotazu
+PARAMSTYLE = None
+# Cesta k JSON reportu s měřením fází, None měření vypíná
+MERENI = None
+# Fáze, ze které se navíc uloží profil cProfile do profil.prof
+PROFIL_FAZE = None
+
+# Fáze sestavení v pořadí, ve kterém se volají na objektu Jadro
+FAZE = (
+    # schémata jednotlivých tabulek
+    'naformatuje_zdrojovy_soubor',
+    'zpracuje_seznam_tabulek',
+    'vytvoreni_objektu_tabulek',
+    'vytvoreni_schemat',
+    'zapsani_schemat_do_souboru',
+    'nacteni_schemat_ze_souboru',
+    'porovna_a_zapise_schema',
+
+    # celkové schéma
+    'nacteni_schemat_ze_souboru',
+    'filtruj_sloupce',
+    'filtruj_nepouzite_tabulky',
+    'doplneni_atributu',
+    'zapsani_celkoveho_schema_do_souboru',
+    'nacteni_celkoveho_schema_ze_souboru',
+    'porovna_a_zapise_celkove_schema',
+
+    # joiny a výsledný SQL příkaz
+    'priprava_pro_sql',
+    'priprava_joinu_pro_sql',
+    'zapsani_join_schema_do_souboru',
+    'nacteni_join_schema_ze_souboru',
+    'porovna_a_zapise_join_schema',
+    'zpracovani_joinu',
+    'sestaveni_sql',
+    'ulozeni_vysledneho_sql',
+    'ulozeni_manifestu',
+)
+
+# Fáze jednotlivých příkazů cli.py
+# init: vytvoří chybějící schémata tabulek a soubor joinů
+FAZE_INIT = (
+    'naformatuje_zdrojovy_soubor',
+    'zpracuje_seznam_tabulek',
+    'vytvoreni_objektu_tabulek',
+    'vytvoreni_schemat',
+    'zapsani_schemat_do_souboru',
+    'priprava_joinu_pro_sql',
+    'zapsani_join_schema_do_souboru',
+)
+# merge: doplní do upravených schémat nové tabulky a sloupce
+# a z vybraných sloupců sestaví celkové schéma
+FAZE_MERGE = FAZE[:FAZE.index('priprava_pro_sql')] + (
+    'priprava_joinu_pro_sql',
+    'zapsani_join_schema_do_souboru',
+    'nacteni_join_schema_ze_souboru',
+    'porovna_a_zapise_join_schema',
+)
+# build: sestaví SQL příkaz z již upraveného celkového schéma
+# a joinů, schémata tabulek se nečtou
+FAZE_BUILD = (
+    'nacteni_celkoveho_schema_ze_souboru',
+    'priprava_pro_sql',
+    'nacteni_join_schema_ze_souboru',
+    'zpracovani_joinu',
+    'sestaveni_sql',
+    'ulozeni_vysledneho_sql',
+)
+# analyze: sestaví SQL a ověří jeho plán nad prázdnou databází
+FAZE_ANALYZA = FAZE_BUILD + (
+    'analyza_planu',
+)
+# export: vyexportuje katalog, výběr sloupců, sloupce dotazu
+# a joiny do excelu nebo CSV
+FAZE_EXPORT = FAZE_BUILD[:FAZE_BUILD.index('sestaveni_sql')] + (
+    'export_metadat',
+)
 
 
 # Hlavní metoda skriptu
-def main():
+def main() -> int:
 
     format = "%(asctime)s: %(message)s"
     logging.basicConfig(format=format, level=logging.INFO, datefmt="%H:%M:%S")
@@ -13,35 +105,49 @@ def main():
     print()
     logging.info('Spuštění skriptu')
 
-    jadro = Jadro(os.path.dirname(__file__))
-    jadro.naformatuje_zdrojovy_soubor()
-    jadro.zpracuje_seznam_tabulek()
-    jadro.vytvoreni_objektu_tabulek()
-    jadro.vytvoreni_schemat()
-    jadro.zapsani_schemat_do_souboru()
-    jadro.nacteni_schemat_ze_souboru()
-    jadro.porovna_a_zapise_schema()
-
-    jadro.nacteni_schemat_ze_souboru()
-    jadro.filtruj_sloupce()
-    jadro.filtruj_nepouzite_tabulky()
-    jadro.doplneni_atributu()
-    jadro.zapsani_celkoveho_schema_do_souboru()
-    jadro.nacteni_celkoveho_schema_ze_souboru()
-    jadro.porovna_a_zapise_celkove_schema()
-
-    jadro.priprava_pro_sql()
-    jadro.priprava_joinu_pro_sql()
-    jadro.zapsani_join_schema_do_souboru()
-    jadro.nacteni_join_schema_ze_souboru()
-    jadro.porovna_a_zapise_join_schema()
-    jadro.zpracovani_joinu()
-    jadro.sestaveni_sql()
-    jadro.ulozeni_vysledneho_sql()
+    cesta = os.path.dirname(__file__)
+
+    # Když se od posledního běhu nic nezměnilo,
+    # není co sestavovat
+    slozka = os.path.join(cesta, Jadro.slozka)
+    manifest = Manifest(
+        slozka,
+        nastaveni=Manifest.nastaveni_sestaveni(PARAMSTYLE, AUTOMATICKE_JOINY)
+    )
+    if manifest.je_aktualni():
+        logging.info('Vstupy se nezměnily, výstup je aktuální.')
+        logging.info('Ukončení skriptu')
+        print()
+        return 0
+
+    mereni = Mereni(MERENI is not None, profil_faze=PROFIL_FAZE)
+    mereni.spusteni()
+
+    uloziste = vytvoreni_uloziste(ULOZISTE, slozka)
+    with mereni.faze('nacteni_katalogu'):
+        jadro = Jadro(cesta, manifest, POCET_VLAKEN, uloziste)
+    jadro.automaticke_joiny = AUTOMATICKE_JOINY
+    jadro.paramstyle = PARAMSTYLE
+
+    for faze in FAZE:
+        with mereni.faze(faze):
+            getattr(jadro, faze)()
+
+    uloziste.uzavreni()
+
+    mereni.ukonceni()
+    mereni.zaznam_poctu(jadro)
+    mereni.ulozeni(MERENI)
+
+    if jadro.chyby:
+        for tabulka, chyba in jadro.chyby.items():
+            logging.error(f'Chyba u tabulky {tabulka}: {chyba}')
+        return 1
 
     logging.info('Ukončení skriptu')
     print()
+    return 0
 
 # Hlavní vlákno skriptu
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
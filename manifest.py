@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+import hashlib
+import logging
+import os
+from typing import Any, Callable, Iterable
+from cteni import Cteni
+from zapsani import Zapsani
+
+
+class Manifest:
+
+    """
+    Třída pro manifest sestavení, který si pamatuje otisky
+    vstupních a výstupních souborů z posledního běhu
+    """
+    def __init__(
+            self,
+            cesta: str,
+            nazev: str = '.manifest.json',
+            otisk_katalogu: str | None = None,
+            nastaveni: dict[str, Any] | None = None
+        ) -> None:
+        self.cesta = cesta
+        self.nazev = nazev
+        # hash sdíleného katalogu mimo složku projektu, když je
+        # zadaný, porovnává se místo souboru sloupce.csv
+        self.otisk_katalogu = otisk_katalogu
+        self.predchozi_otisk_katalogu = ''
+        # volby sestavení, které mění výstup, viz nastaveni_sestaveni,
+        # jejich změna se bere jako změna vstupů
+        self.nastaveni = nastaveni
+        self.predchozi_nastaveni: dict[str, Any] | None = None
+        # otisk kanonického tvaru sestaveného dotazu, viz Dotaz.otisk
+        self.otisk_dotazu = ''
+        # název souboru -> {'mtime': ..., 'velikost': ..., 'hash': ...}
+        self.soubory: dict[str, dict] = {}
+        # tabulka -> hash seznamu jejích sloupců v katalogu
+        self.tabulky: dict[str, str] = {}
+        # výsledky zmeneno() v rámci jednoho běhu, aby se
+        # sdílený soubor nehashoval opakovaně
+        self._zmeny: dict[str, bool] = {}
+        self.nacteni()
+
+    def nacteni(self) -> None:
+        """
+        Načte manifest z předchozího běhu, pokud existuje
+        """
+        n = Cteni(self.cesta)
+        vs = n.vstupni_soubor(self.nazev)
+
+        if not os.path.exists(vs):
+            logging.info('Manifest sestavení neexistuje.')
+            return
+
+        try:
+            data = n.cteni_json(vs)
+        except ValueError:
+            logging.info('Manifest sestavení je poškozený, ignoruje se.')
+            return
+
+        self.soubory = data.get('soubory', {})
+        self.tabulky = data.get('tabulky', {})
+        self.predchozi_otisk_katalogu = data.get('katalog', '')
+        self.otisk_dotazu = data.get('dotaz', '')
+        self.predchozi_nastaveni = data.get('nastaveni')
+
+    def ulozeni(self) -> None:
+        """
+        Zapíše manifest do souboru
+        """
+        z = Zapsani(self.cesta, jen_zmeny=True)
+        z.zapsani_json(
+            z.vystupni_soubor(self.nazev),
+            {
+                'soubory': self.soubory,
+                'tabulky': self.tabulky,
+                'katalog': self.otisk_katalogu or '',
+                'dotaz': self.otisk_dotazu,
+                'nastaveni': self.nastaveni or {}
+            }
+        )
+
+    @staticmethod
+    def hash_souboru(cesta: str) -> str:
+        """
+        Vrací SHA-256 obsahu souboru, soubor se čte po blocích
+        """
+        h = hashlib.sha256()
+        with open(cesta, 'rb') as f:
+            for blok in iter(lambda: f.read(1 << 20), b''):
+                h.update(blok)
+        return h.hexdigest()
+
+    @staticmethod
+    def nastaveni_sestaveni(paramstyle: str | None, automaticke_joiny: bool) -> dict[str, Any]:
+        """
+        Vrací volby sestavení, které se zaznamenají do manifestu
+        """
+        return {'paramstyle': paramstyle, 'automaticke_joiny': automaticke_joiny}
+
+    @staticmethod
+    def hash_katalogu(katalog: dict[str, list[str]]) -> str:
+        """
+        Vrací otisk celého katalogu, použije se místo hashe
+        souboru sloupce.csv u katalogu načteného z databáze
+        """
+        h = hashlib.sha256()
+        for tabulka, sloupce in katalog.items():
+            h.update(f'{tabulka}:{",".join(sloupce)}\n'.encode('utf8'))
+        return h.hexdigest()
+
+    def hash_sloupcu(self, sloupce: list[str]) -> str:
+        """
+        Vrací otisk seznamu sloupců jedné tabulky
+        """
+        return hashlib.sha256('\n'.join(sloupce).encode('utf8')).hexdigest()
+
+    def zmeneno(self, nazev: str) -> bool:
+        """
+        Zjistí, zda se soubor od posledního běhu změnil. Nejdříve
+        se porovná čas změny a velikost, hash se počítá jen
+        v případě, že se liší
+        """
+        if nazev not in self._zmeny:
+            self._zmeny[nazev] = self._porovnani_souboru(nazev)
+        return self._zmeny[nazev]
+
+    def _porovnani_souboru(self, nazev: str) -> bool:
+        zaznam = self.soubory.get(nazev)
+        if zaznam is None:
+            return True
+
+        cesta = os.path.join(self.cesta, nazev)
+        if not os.path.exists(cesta):
+            return True
+
+        st = os.stat(cesta)
+        if st.st_size != zaznam['velikost']:
+            return True
+        if st.st_mtime_ns == zaznam['mtime']:
+            return False
+
+        return self.hash_souboru(cesta) != zaznam['hash']
+
+    def je_aktualni(self) -> bool:
+        """
+        Vrací True, když se od posledního běhu nezměnil
+        žádný ze zaznamenaných souborů
+        """
+        if not self.soubory:
+            return False
+
+        if self.katalog_zmenen():
+            return False
+
+        if self.nastaveni is not None and self.nastaveni != self.predchozi_nastaveni:
+            return False
+
+        for nazev in self.soubory:
+            if self.zmeneno(nazev):
+                return False
+        return True
+
+    def katalog_zmenen(self) -> bool:
+        """
+        Zjistí, zda se od posledního běhu změnil katalog
+        """
+        if self.otisk_katalogu is not None:
+            return self.otisk_katalogu != self.predchozi_otisk_katalogu
+        return self.zmeneno('sloupce.csv')
+
+    def zmenene_tabulky(
+            self,
+            katalog: dict[str, list[str]],
+            soubor_tabulky: Callable[[str], str] = lambda t: f'{t}.txt'
+        ) -> set[str]:
+        """
+        Vrací množinu tabulek, u kterých se změnil seznam sloupců
+        v katalogu nebo jejich soubor se schématem
+        """
+        katalog_zmenen = self.katalog_zmenen()
+        res: set[str] = set()
+
+        for tabulka, sloupce in katalog.items():
+            if katalog_zmenen and self.tabulky.get(tabulka) != self.hash_sloupcu(sloupce):
+                res.add(tabulka)
+            elif self.zmeneno(soubor_tabulky(tabulka)):
+                res.add(tabulka)
+
+        return res
+
+    def zaznamenani(
+            self,
+            nazvy: Iterable[str],
+            katalog: dict[str, list[str]]
+        ) -> None:
+        """
+        Uloží otisky zadaných souborů a sloupců tabulek z katalogu
+        """
+        soubory: dict[str, dict] = {}
+
+        for nazev in nazvy:
+            cesta = os.path.join(self.cesta, nazev)
+            if not os.path.exists(cesta):
+                continue
+
+            st = os.stat(cesta)
+            zaznam = self.soubory.get(nazev)
+            # hash se přepočítá jen u souborů, které se změnily
+            if (zaznam is not None
+                    and zaznam['velikost'] == st.st_size
+                    and zaznam['mtime'] == st.st_mtime_ns):
+                soubory[nazev] = zaznam
+            else:
+                soubory[nazev] = {
+                    'mtime': st.st_mtime_ns,
+                    'velikost': st.st_size,
+                    'hash': self.hash_souboru(cesta)
+                }
+
+        self.soubory = soubory
+        self._zmeny = {}
+        if self.otisk_katalogu is not None:
+            self.predchozi_otisk_katalogu = self.otisk_katalogu
+        if self.nastaveni is not None:
+            self.predchozi_nastaveni = self.nastaveni
+        self.tabulky = {t: self.hash_sloupcu(s) for t, s in katalog.items()}
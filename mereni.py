@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Právě běžící měření, do kterého zapisují Cteni a Zapsani
+_aktivni: 'Mereni | None' = None
+
+
+def zaznam_cteni(cesta: str, bajty: int | None = None) -> None:
+    """
+    Zaznamená přečtený soubor do běžícího měření,
+    bez měření nedělá nic
+    """
+    if _aktivni is not None:
+        _aktivni.zaznam_souboru('cteni', cesta, bajty)
+
+
+def zaznam_zapisu(cesta: str, bajty: int | None = None) -> None:
+    """
+    Zaznamená zapsaný soubor do běžícího měření,
+    bez měření nedělá nic
+    """
+    if _aktivni is not None:
+        _aktivni.zaznam_souboru('zapis', cesta, bajty)
+
+
+class Mereni:
+
+    """
+    Volitelné měření jednotlivých fází sestavení: čas, čas CPU,
+    alokovaná paměť, počet a velikost čtených a zapsaných souborů
+    """
+    def __init__(
+            self,
+            aktivni: bool = True,
+            pamet: bool = True,
+            profil_faze: str | None = None,
+            profil_vystup: str = 'profil.prof'
+        ) -> None:
+        self.aktivni = aktivni
+        self.pamet = pamet
+        # fáze, která se navíc změří přes cProfile
+        self.profil_faze = profil_faze
+        self.profil_vystup = profil_vystup
+
+        self.faze_vysledky: dict[str, dict[str, Any]] = {}
+        self.pocty: dict[str, int] = {}
+        self._soubory = self.prazdne_soubory()
+        # do počítadel souborů zapisují i vlákna z Jadro.zpracovani_tabulek
+        self._zamek = threading.Lock()
+        self._spustil_tracemalloc = False
+
+    def prazdne_soubory(self) -> dict[str, int]:
+        return {'cteni_souboru': 0, 'cteni_bajtu': 0, 'zapis_souboru': 0, 'zapis_bajtu': 0}
+
+    def zaznam_souboru(self, druh: str, cesta: str, bajty: int | None) -> None:
+        if bajty is None:
+            try:
+                bajty = os.path.getsize(cesta)
+            except OSError:
+                bajty = 0
+        with self._zamek:
+            self._soubory[f'{druh}_souboru'] += 1
+            self._soubory[f'{druh}_bajtu'] += bajty
+
+    def spusteni(self) -> None:
+        """
+        Zapne sledování souborů a případně paměti
+        """
+        global _aktivni
+        if not self.aktivni:
+            return
+        _aktivni = self
+        # tracemalloc a cProfile se načítají, až když se měří
+        import tracemalloc
+        if self.pamet and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._spustil_tracemalloc = True
+
+    def ukonceni(self) -> None:
+        global _aktivni
+        if _aktivni is self:
+            _aktivni = None
+        if self._spustil_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._spustil_tracemalloc = False
+
+    @contextmanager
+    def faze(self, nazev: str) -> Iterator[None]:
+        """
+        Změří jednu fázi, opakované fáze dostanou pořadí #2, #3...
+        """
+        if not self.aktivni:
+            yield
+            return
+
+        import cProfile
+        import tracemalloc
+
+        with self._zamek:
+            self._soubory = self.prazdne_soubory()
+        profil = cProfile.Profile() if nazev == self.profil_faze else None
+
+        if self.pamet and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            pamet_pred = tracemalloc.get_traced_memory()[0]
+        cas = time.perf_counter()
+        cpu = time.process_time()
+        if profil is not None:
+            profil.enable()
+
+        try:
+            yield
+        finally:
+            if profil is not None:
+                profil.disable()
+                profil.dump_stats(self.profil_vystup)
+                logging.info(f'Profil fáze {nazev} zapsaný do {self.profil_vystup}')
+
+            vysledek: dict[str, Any] = {
+                'cas': time.perf_counter() - cas,
+                'cas_cpu': time.process_time() - cpu
+            }
+            if self.pamet and tracemalloc.is_tracing():
+                aktualni, spicka = tracemalloc.get_traced_memory()
+                vysledek['alokace'] = aktualni - pamet_pred
+                vysledek['spicka_pameti'] = spicka
+            with self._zamek:
+                vysledek.update(self._soubory)
+
+            klic = nazev
+            poradi = 1
+            while klic in self.faze_vysledky:
+                poradi += 1
+                klic = f'{nazev}#{poradi}'
+            self.faze_vysledky[klic] = vysledek
+
+    def zaznam_poctu(self, jadro: Any) -> None:
+        """
+        Zaznamená velikost zpracovaného projektu
+        """
+        if not self.aktivni:
+            return
+        graf = getattr(jadro, 'graf', None)
+        self.pocty = {
+            'tabulky': len(jadro.seznam_tabulek),
+            'sloupce': sum(len(i) for i in jadro.katalog.values()),
+            'vybrane_sloupce': len(jadro._sloupce) + len(jadro._aggs),
+            'joiny': len(jadro._joiny),
+            'poddotazy': len(graf.poddotazy()) if graf is not None else 0
+        }
+
+    def report(self) -> dict[str, Any]:
+        return {
+            'celkem': {
+                'cas': sum(i['cas'] for i in self.faze_vysledky.values()),
+                'cas_cpu': sum(i['cas_cpu'] for i in self.faze_vysledky.values())
+            },
+            'pocty': self.pocty,
+            'faze': self.faze_vysledky
+        }
+
+    def ulozeni(self, vystup: str) -> None:
+        """
+        Zapíše report měření jako JSON
+        """
+        if not self.aktivni:
+            return
+        with open(vystup, 'w', encoding='utf8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=4)
+        logging.info(f'Report měření zapsaný do {vystup}')
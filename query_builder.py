@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 import logging
 import os
-from typing import Any, Self
-from cteni import Cteni
-from zapsani import Zapsani
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Callable, Iterator, Self
+from cteni import Cteni, CachePoddotazu, cache_poddotazu
+from dotaz import POZICNI_STYLY, Dotaz, Join, Podminka, PodminkaKurzoru, Sloupec, Zdroj, parametrizace
+from graf_joinu import GrafJoinu
+from manifest import Manifest
+from mereni import zaznam_zapisu
+from uloziste import SouboroveUloziste, SqliteUloziste
+from zapsani import VELIKOST_BUFFERU, Zapsani
 
 
 class Tabulka:
@@ -11,88 +19,587 @@ class Tabulka:
     """
     Třída pro objekt tabulka
     """
-    def __init__(self, nazev: str, sloupce: list[str]) -> None:
+    __slots__ = ('nazev', 'sloupce')
+
+    def __init__(self, nazev: str, sloupce: tuple[str, ...]) -> None:
         self.nazev: str = nazev
-        self.sloupce: list[str] = sloupce
+        self.sloupce: tuple[str, ...] = sloupce
 
-class Jadro:
 
-    def __init__(self, cesta: str) -> None:
+class AtributySloupce:
 
-        self.mezera = '    '
+    """
+    Atributy jednoho vybraného sloupce v celkovém schématu,
+    každý sloupec má vlastní záznam, do JSON se zapisuje
+    jako slovník přes slovnik()
+    """
+    __slots__ = ('agg', 'alias', 'skryty', 'podminky', 'razeni')
+
+    def __init__(
+            self,
+            agg: str = '',
+            alias: str = '',
+            skryty: str = '',
+            podminky: list[list[str]] | None = None,
+            razeni: str = ''
+        ) -> None:
+        self.agg = agg
+        self.alias = alias
+        self.skryty = skryty
+        self.podminky = podminky if podminky is not None else [['', '']]
+        # asc nebo desc, sloupce se řadí v pořadí ve schématu
+        self.razeni = razeni
+
+    def slovnik(self) -> dict[str, Any]:
+        return {
+            'agg': self.agg,
+            'alias': self.alias,
+            'skryty': self.skryty,
+            'podminky': [list(i) for i in self.podminky],
+            'razeni': self.razeni
+        }
+
+class Zmeny:
 
-        self.slozka = 'src'
-        self.cesta = os.path.join(cesta, self.slozka)
-        
-        # Zpracování dat se seznamem sloupců u tabulek
-        n = Cteni(self.cesta)
-        vs = n.vstupni_soubor('sloupce.csv')
-        self.sloupce: list[list[str]] = n.cteni_csv(vs, 'utf8', ';', '"')
+    """
+    Třída pro výsledek porovnání generovaného a editovaného schéma
+    """
+    def __init__(self) -> None:
+        # klíče nejvyšší úrovně, které v editovaném schématu chyběly
+        self.pridane_tabulky: list[str] = []
+        # cesty k vnořeným klíčům, které chyběly, např.
+        # (tabulka, 'sloupce', sloupec)
+        self.pridane_sloupce: list[tuple[str, ...]] = []
+        # klíče nejvyšší úrovně, kterých se porovnání nedotklo
+        self.nezmenene: list[str] = []
+
+    def dotcene(self) -> list[str]:
+        """
+        Vrací klíče nejvyšší úrovně, u kterých se něco doplnilo,
+        v pořadí jejich prvního výskytu
+        """
+        res = dict.fromkeys(self.pridane_tabulky)
+        res.update(dict.fromkeys(i[0] for i in self.pridane_sloupce))
+        return list(res)
+
+    def __bool__(self) -> bool:
+        return bool(self.pridane_tabulky or self.pridane_sloupce)
+
+
+class Sestaveni:
+
+    """
+    Třída pro sestavení SQL příkazu z celkového schéma a joinů,
+    pracuje jen v paměti, takže se dá použít i bez složky src
+    """
+    def __init__(
+            self,
+            poddotazy: dict[str, str] | None = None,
+            katalog: dict[str, list[str]] | None = None
+        ) -> None:
+
+        self.mezera = '    '
 
-        self.seznam_tabulek: list[str] = []
-        self.tabulky: list[Tabulka] = []
-        self.schema: dict = {}
-        self.schema_upravena: dict = {}
-        self.schema_vysledne: dict = {}
         self.schema_pro_sql: dict = {}
-        
-        self.joiny: dict = {}
         self.joiny_vysledne: dict = {}
 
+        # Texty poddotazů podle hodnoty klíče sql v joinech
+        self.zdroje_poddotazu: dict[str, str] = poddotazy or {}
+        self._hotove_poddotazy: dict[str, str] = {}
+
+        # Katalog tabulka -> sloupce, z jeho klíčových sloupců
+        # se při automatických joinech hledají cesty mezi tabulkami
+        self.katalog: dict[str, list[str]] = katalog or {}
+        self.automaticke_joiny = False
+        self.graf: GrafJoinu | None = None
+
+        # Styl zástupných znaků podle DB-API, když je zadaný,
+        # literály z podmínek se místo do textu dotazu
+        # předávají jako parametry
+        self.paramstyle: str | None = None
+        self.parametry: list[Any] = []
+
         self.vychozi_tabulka: str = ''
+        # SQL poddotazu, když je výchozí tabulkou poddotaz
+        self.vychozi_poddotaz: str = ''
+
+        # Počet řádků stránky a sloupce kurzoru z joinu
+        # výchozí tabulky, s kurzorem se sestaví i dotaz
+        # na další stránku
+        self.limit = 0
+        self.kurzor: tuple[str, ...] = ()
+        self.podminka_kurzoru: PodminkaKurzoru | None = None
+        self.dotaz_dalsi: Dotaz | None = None
+        self.prikaz_dalsi = ''
 
         self.priznak_group_by = False
         self.priznak_joinu = False
 
-        self._from = []
-        self._aggs = []
+        # části modelu dotazu, viz modul dotaz
+        self._from: list[str] = []
+        self._aggs: list[Sloupec] = []
         # sloupce a group by je nutné dělat zvlášť, protože
         # sloupce můžou mít aliasy 
-        self._gb = []
-        self._where = []
-        self._sloupce = []
-        self._joiny = []
-        self._aliasy = []
-
+        self._gb: list[str] = []
+        self._where: list[Podminka] = []
+        # (výraz, směr) pro order by
+        self._razeni: list[tuple[str, str]] = []
+        self._sloupce: list[Sloupec] = []
+        self._joiny: list[Join] = []
+        self._aliasy: list[str] = []
+
+        self.dotaz: Dotaz | None = None
         self.prikaz = ''
 
-        self.doplnovane_schema = {'agg': '', 'alias': '', 'skryty': '', 'podminky': [['', '']]}
+    def nacteni_poddotazu(self, nazev: str, otevrene: tuple[str, ...] = ()) -> str | None:
+        """
+        Vrací text poddotazu spojený do jednoho řádku, v paměťovém
+        režimu ze slovníku zdroje_poddotazu. Vnořené poddotazy
+        {{nazev}} se dosadí a každý se zpracuje jen jednou
+        """
+        if nazev in self._hotove_poddotazy:
+            return self._hotove_poddotazy[nazev]
+        if nazev not in self.zdroje_poddotazu or nazev in otevrene:
+            logging.info(f'Poddotaz {nazev} není zadaný.')
+            return None
+
+        text = ' '.join(radek.rstrip() for radek in self.zdroje_poddotazu[nazev].splitlines())
+
+        def dosazeni(shoda: re.Match) -> str:
+            vnoreny = self.nacteni_poddotazu(shoda.group(1), otevrene + (nazev,))
+            return shoda.group(0) if vnoreny is None else vnoreny
+
+        text = CachePoddotazu.vnoreny.sub(dosazeni, text)
+        self._hotove_poddotazy[nazev] = text
+        return text
+
+    def kontrola_2d_pole(self, arr: list[Any]) -> bool:
+        """
+        Kontrola 2d pole, které se používá například 
+        u JOINů nebo podmínek WHERE
+        """
+        res = False
+        for radek in arr:
+            for clen in radek:
+                if clen != '':
+                    res = True
+        return res
+    
+    def priprava_pro_sql(self) -> Self:
+        """
+        Zpracuje výsledný JSON do uzlů modelu dotazu
+        """
+        # projdi celkové schéma
+        for i, ihod in self.schema_pro_sql.items():
+            # do klauzule FROM přidej všechny tabulky
+            self._from.append(i)
+            # projdi část schéma se sloupci
+            for j, jhod in ihod['sloupce'].items():
+                # kontrola, zda se jedná o sloupce
+                if not isinstance(jhod, dict):
+                    continue
+
+                agg = jhod.get('agg') or ''
+                alias = jhod.get('alias') or ''
+
+                if alias:
+                    self._aliasy.append(alias)
+
+                if agg:
+                    # sloupec obalený agregační funkcí
+                    # a nastav příznak agregace na True
+                    self.priznak_group_by = True
+                    self._aggs.append(Sloupec.vytvor(j, agg, alias))
+                elif jhod.get('skryty') != 'ano':
+                    # sloupce a group by je nutné dělat zvlášť,
+                    # protože sloupce můžou mít aliasy
+                    self._sloupce.append(Sloupec.vytvor(j, '', alias))
+                    self._gb.append(j)
+
+                razeni = (jhod.get('razeni') or '').strip().lower()
+                if razeni:
+                    if razeni not in ('asc', 'desc'):
+                        raise ValueError(f'Neznámé řazení sloupce {j}: {razeni}')
+                    self._razeni.append((f'{agg}({j})' if agg else j, razeni))
+
+                podminky = jhod.get('podminky')
+                if podminky and self.kontrola_2d_pole(podminky):
+                    for p in podminky:
+                        # sloupec, operátor, hodnota
+                        if not (p[0] or p[1]):
+                            continue
+                        hodnota = p[1]
+                        parametry: list[Any] = []
+                        if self.paramstyle:
+                            hodnota, parametry = parametrizace(
+                                p[0], p[1], self.paramstyle, len(self.parametry) + 1
+                            )
+                            self.parametry += parametry
+                        self._where.append(Podminka.vytvor(j, p[0], hodnota, tuple(parametry)))
+
+        return self
+    
+    def zpracovani_joinu(self) -> Self:
+        """
+        Zpracuje definované joiny přes graf joinů. Poddotazy se
+        načtou jednou pro každý uzel a dosadí se podle cílové
+        tabulky hrany, chybějící napojení vybraných tabulek se
+        případně dohledají po klíčových sloupcích katalogu
+        """
+        self.graf = GrafJoinu.z_definice(self.joiny_vysledne)
+
+        # otevře externí soubor s sql příkazem
+        for uzel in self.graf.poddotazy():
+            uzel.poddotaz = self.nacteni_poddotazu(uzel.sql) or ''
+
+        vychozi = self.graf.vychozi()
+        if vychozi is not None:
+            self.vychozi_tabulka = vychozi.nazev
+            self.vychozi_poddotaz = vychozi.poddotaz
+            self.limit = vychozi.limit
+            self.kurzor = vychozi.kurzor
+
+        hrany = list(self.graf.hrany)
+
+        if self.automaticke_joiny and self._from:
+            if not self.vychozi_tabulka:
+                self.vychozi_tabulka = self._from[0]
+            self.graf.pridani_klicu(self.katalog)
+            pripojene = [self.vychozi_tabulka] + [h.cil for h in hrany]
+            hrany += self.graf.doplneni_cest(pripojene, self._from)
 
-        self.poddotazy = []
+        for h in hrany:
+            uzel = self.graf.uzly.get(h.cil)
+            zdroj = Zdroj.vytvor(h.cil, uzel.poddotaz if uzel else '')
+            self._joiny.append(Join.vytvor(h.typ, zdroj, h.zbytek))
+
+        # ještě ověř, zda zde vůbec nějaké joiny jsou
+        if len(self._joiny) > 0:
+            self.priznak_joinu = True
+
+        logging.info('Joiny zpracovány v pořádku.')
+        return self
+    
+    def razeni_kurzoru(self) -> list[tuple[str, str]]:
+        """
+        Při stránkování kurzorem se řadí jen podle sloupců kurzoru,
+        směr se vezme z jejich atributu razeni, výchozí je asc.
+        Sloupce kurzoru musí být vybrané a bez agregace, aby se
+        jejich hodnoty daly přečíst z posledního řádku stránky,
+        a poslední z nich by měl být jedinečný, jinak se řádky
+        se stejnou hodnotou na hranici stránek přeskočí
+        """
+        vybrane = {s.nazev for s in self._sloupce}
+        for i in self.kurzor:
+            if i not in vybrane:
+                raise ValueError(f'Sloupec kurzoru {i} není mezi vybranými sloupci bez agregace')
+
+        ostatni = [v for v, _ in self._razeni if v not in self.kurzor]
+        if ostatni:
+            logging.info(f'Při stránkování kurzorem se neřadí podle: {", ".join(ostatni)}')
+
+        smery = dict(self._razeni)
+        return [(i, smery.get(i, 'asc')) for i in self.kurzor]
+
+    def sestaveni_sql(self) -> Self:
+        """
+        Sestavení SQL příkazu z modelu dotazu, klauzule se
+        vykreslí jedním průchodem a už vykreslené části
+        se znovu použijí. S kurzorem se sestaví i dotaz na
+        další stránku, který se od prvního liší jen podmínkou
+        kurzoru, takže každá stránka stojí stejně bez ohledu
+        na to, kolik řádků se už přečetlo
+        """
+        if isinstance(self.limit, bool) or not isinstance(self.limit, int) or self.limit < 0:
+            raise ValueError(f'Limit musí být nezáporné celé číslo: {self.limit}')
+
+        razeni = self.razeni_kurzoru() if self.kurzor else self._razeni
+
+        self.dotaz = Dotaz.sestaveni(
+            self._sloupce,
+            self._aggs,
+            Zdroj.vytvor(self.vychozi_tabulka, self.vychozi_poddotaz),
+            self._joiny,
+            self._where,
+            self._gb,
+            razeni,
+            self.limit
+        )
+        self.prikaz = self.dotaz.vykresleni()
+
+        if self.kurzor:
+            # hodnoty kurzoru jsou vždy parametry, bez zadaného
+            # stylu pojmenované, číslují se až za podmínkami where
+            self.podminka_kurzoru = PodminkaKurzoru.sestaveni(
+                [v for v, _ in razeni],
+                [s for _, s in razeni],
+                self.paramstyle or 'named',
+                len(self.parametry) + 1
+            )
+            self.dotaz_dalsi = self.dotaz.dalsi_stranka(self.podminka_kurzoru)
+            self.prikaz_dalsi = self.dotaz_dalsi.vykresleni()
+        return self
+
+    def hodnoty_parametru(self) -> list[Any] | dict[str, Any]:
+        """
+        Vrací parametry dotazu, u pojmenovaných stylů
+        jako slovník p1, p2..., jinak jako seznam
+        """
+        if self.paramstyle in ('named', 'pyformat'):
+            return {f'p{i}': hodnota for i, hodnota in enumerate(self.parametry, 1)}
+        return list(self.parametry)
+
+    def hodnoty_dalsi_stranky(self) -> list[Any] | dict[str, Any]:
+        """
+        Parametry dotazu na další stránku pro ověření plánu,
+        za hodnoty kurzoru se dosadí NULL
+        """
+        p = self.podminka_kurzoru
+        hodnoty = self.hodnoty_parametru()
+        styl = self.paramstyle or 'named'
+        zacatek = len(self.parametry) + 1
+
+        if styl in ('named', 'pyformat'):
+            res = dict(hodnoty) if isinstance(hodnoty, dict) else {}
+            res.update({f'p{zacatek + i}': None for i in range(len(p.sloupce))})
+            return res
+        if styl in POZICNI_STYLY:
+            return hodnoty + [None] * len(p.poradi_parametru())
+        return hodnoty + [None] * len(p.sloupce)
+
+    def sestaveni_se_stylem(self, paramstyle: str | None) -> 'Sestaveni':
+        """
+        Sestaví stejný dotaz s jiným stylem zástupných znaků,
+        hotové joiny se převezmou, znovu se zpracují jen podmínky
+        """
+        s = Sestaveni(katalog=self.katalog)
+        s.paramstyle = paramstyle
+        s.schema_pro_sql = self.schema_pro_sql
+        s.priprava_pro_sql()
+
+        s._joiny = self._joiny
+        s.priznak_joinu = self.priznak_joinu
+        s.vychozi_tabulka = self.vychozi_tabulka
+        s.vychozi_poddotaz = self.vychozi_poddotaz
+        s.limit = self.limit
+        s.kurzor = self.kurzor
+        return s.sestaveni_sql()
+
+    def popis_kurzoru(self) -> dict[str, Any]:
+        """
+        Popis kurzoru pro dotaz na další stránku: sloupce, jejich
+        názvy ve výsledku a zástupné znaky pro hodnoty posledního
+        řádku předchozí stránky. U pozičních stylů je v poradi
+        pořadí sloupců, jak se dosazují za parametry podmínek where
+        """
+        p = self.podminka_kurzoru
+        nazvy = {s.nazev: s.alias or s.nazev.rpartition('.')[2] for s in self._sloupce}
+        res: dict[str, Any] = {
+            'sloupce': list(p.sloupce),
+            'smery': list(p.smery),
+            'vysledek': [nazvy[i] for i in p.sloupce],
+            'zastupne_znaky': list(p.znaky)
+        }
+        if (self.paramstyle or 'named') in POZICNI_STYLY:
+            res['poradi'] = [p.sloupce[i] for i in p.poradi_parametru()]
+        return res
+
+    def radky_katalogu(self) -> Iterator[tuple[str, ...]]:
+        """
+        Řádky katalogu pro export, první řádek je hlavička
+        """
+        yield ('tabulka', 'sloupec')
+        for tabulka, sloupce in self.katalog.items():
+            for sloupec in sloupce:
+                yield (tabulka, sloupec)
+
+    def radky_vyberu(self) -> Iterator[tuple[str, ...]]:
+        """
+        Řádky vybraných sloupců celkového schéma s jejich
+        atributy pro export, první řádek je hlavička
+        """
+        yield ('tabulka', 'sloupec', 'agg', 'alias', 'skryty', 'podminky', 'razeni')
+        for tabulka, obsah in self.schema_pro_sql.items():
+            for sloupec, atributy in obsah['sloupce'].items():
+                if not isinstance(atributy, dict):
+                    continue
+                podminky = atributy.get('podminky')
+                if not (podminky and self.kontrola_2d_pole(podminky)):
+                    podminky = []
+                yield (
+                    tabulka,
+                    sloupec,
+                    atributy.get('agg') or '',
+                    atributy.get('alias') or '',
+                    atributy.get('skryty') or '',
+                    ' and '.join(f'{p[0]} {p[1]}' for p in podminky if p[0] or p[1]),
+                    atributy.get('razeni') or ''
+                )
+
+    def radky_dotazu(self) -> Iterator[tuple[Any, ...]]:
+        """
+        Řádky se sloupci sestaveného dotazu v pořadí klauzule
+        select pro export, první řádek je hlavička
+        """
+        yield ('poradi', 'sloupec', 'agg', 'alias', 'vyraz')
+        for poradi, s in enumerate(self._sloupce + self._aggs, 1):
+            yield (poradi, s.nazev, s.agg, s.alias, s.vykresleni())
+
+    def radky_joinu(self) -> Iterator[tuple[Any, ...]]:
+        """
+        Řádky s joiny sestaveného dotazu pro export,
+        první řádek je hlavička
+        """
+        yield ('poradi', 'typ', 'tabulka', 'poddotaz', 'podminka')
+        for poradi, j in enumerate(self._joiny, 1):
+            yield (poradi, j.typ, j.zdroj.nazev, 'ano' if j.zdroj.poddotaz else '', j.zbytek)
+
+
+class Jadro(Sestaveni):
+
+    slozka: str = 'src'
+
+    def __init__(
+            self,
+            cesta: str,
+            manifest: Manifest | None = None,
+            pocet_vlaken: int = 1,
+            uloziste: SouboroveUloziste | SqliteUloziste | None = None,
+            katalog: dict[str, list[str]] | None = None
+        ) -> None:
+        super().__init__()
+
+        self.cesta = os.path.join(cesta, self.slozka)
+        
+        # Zpracování dat se seznamem sloupců u tabulek,
+        # soubor se čte proudově rovnou do indexu katalogu:
+        # tabulka -> seznam sloupců v pořadí jejich výskytu.
+        # Při dávkovém sestavení se předává už načtený katalog
+        if katalog is not None:
+            self.katalog: dict[str, list[str]] = katalog
+        else:
+            n = Cteni(self.cesta)
+            vs = n.vstupni_soubor('sloupce.csv')
+            self.katalog = n.cteni_katalogu(vs, 'utf8', ';', '"')
+        self.seznam_tabulek: list[str] = []
+
+        # Manifest předchozího sestavení, když je k dispozici,
+        # přepočítají se jen tabulky se změněnými vstupy
+        self.manifest = manifest
+        self.zmenene_tabulky: set[str] | None = None
+
+        # Počet vláken pro čtení a zápis souborů jednotlivých
+        # tabulek, chyby se zaznamenávají k dané tabulce
+        self.pocet_vlaken = max(1, pocet_vlaken)
+        self.chyby: dict[str, str] = {}
+
+        # Úložiště schémat jednotlivých tabulek, výchozí
+        # je jeden soubor <tabulka>.txt na tabulku
+        self.uloziste = uloziste or SouboroveUloziste(self.cesta)
+
+        self.tabulky: list[Tabulka] = []
+        self.schema: dict = {}
+        self.schema_upravena: dict = {}
+        self.schema_vysledne: dict = {}
+        
+        self.joiny: dict = {}
+
+        self.soubory_poddotazu: list[str] = []
+
+        # Formát exportu metadat: 'xlsx' nebo 'csv'
+        self.format_exportu = 'xlsx'
+
+        # Výsledek analýzy plánu dotazu, viz modul analyza
+        self.analyza: dict[str, Any] = {}
 
     def naformatuje_zdrojovy_soubor(self) -> Self:
         """
-        Zmenší písmo ve zdrojovm soubory s tabulkami a sloupci
+        Zmenší písmo ve zdrojovm soubory s tabulkami a sloupci,
+        to už se ale děje přímo při proudovém načtení katalogu
         """
-        self.sloupce = [[j.lower() for j in i] for i in self.sloupce]
         return self
 
     def zpracuje_seznam_tabulek(self) -> Self:
         """
-        Získá seznam tabulek z dat o tabulkách a jejich sloupcích
+        Získá seznam tabulek z indexu katalogu
         """
-        temp: list[str] = []
-        if not self.sloupce:
+        if not self.katalog:
             return None
-    
-        # Přidána podmínka na hlavičku
-        temp = [radek[0] for radek in self.sloupce if radek[0] != 'tabulka']
-        
-        # Pouze jedinečné hodnoty
-        self.seznam_tabulek = list(set(temp))
+
+        # Pouze jedinečné hodnoty, v pořadí prvního výskytu
+        self.seznam_tabulek = list(self.katalog)
+
+        if self.manifest is not None:
+            self.zmenene_tabulky = self.manifest.zmenene_tabulky(
+                self.katalog,
+                self.uloziste.soubor
+            )
+            logging.info(f'Počet tabulek ke zpracování: {len(self.zmenene_tabulky)}')
         return self
+
+    def tabulky_k_prepoctu(self) -> list[str]:
+        """
+        Vrací tabulky, jejichž vstupy se od posledního běhu
+        změnily, bez manifestu jsou to všechny tabulky
+        """
+        if self.zmenene_tabulky is None:
+            return self.seznam_tabulek
+        return [i for i in self.seznam_tabulek if i in self.zmenene_tabulky]
+
+    def zpracovani_tabulek(
+            self,
+            funkce: Callable[[str], Any],
+            tabulky: list[str]
+        ) -> list[Any]:
+        """
+        Zavolá funkci pro každou tabulku, při více vláknech
+        souběžně. Výsledky jsou vždy ve stejném pořadí jako
+        tabulky, chyba jedné tabulky se zaznamená do self.chyby
+        a místo výsledku se vrátí None
+        """
+        def obal(tabulka: str) -> Any:
+            try:
+                return funkce(tabulka)
+            except (OSError, ValueError) as e:
+                self.chyby[tabulka] = str(e)
+                logging.info(f'Chyba u tabulky {tabulka}: {e}')
+                return None
+
+        if self.pocet_vlaken > 1 and len(tabulky) > 1:
+            with ThreadPoolExecutor(max_workers=self.pocet_vlaken) as ex:
+                return list(ex.map(obal, tabulky))
+
+        return [obal(i) for i in tabulky]
+
+    def zmeneno(self, *nazvy: str) -> bool:
+        """
+        Zjistí, zda se některý ze souborů od posledního
+        běhu změnil, bez manifestu se bere vše jako změněné
+        """
+        if self.manifest is None:
+            return True
+        return any(self.manifest.zmeneno(i) for i in nazvy)
     
-    def zpracuj_sloupce_tabulky(self, tabulka: str) -> list[str]:
+    def nacteni_poddotazu(self, nazev: str, otevrene: tuple[str, ...] = ()) -> str | None:
         """
-        Vrací seznam sloupců vybrané tabulky
+        Načte poddotaz z SQL souboru ve složce projektu přes
+        sdílenou cache, která hlídá změny souborů
         """
-        temp: list[str] = []
+        n = Cteni(self.cesta)
+        vs = n.vstupni_soubor(nazev)
+        sql = cache_poddotazu.cteni(vs)
 
-        for i in self.sloupce:
-            if i[1] != 'sloupec' and i[0] == tabulka:
-                temp.append(i[1])
+        # do manifestu patří i soubory vnořených poddotazů
+        self.soubory_poddotazu.append(nazev)
+        for i in cache_poddotazu.zavislosti(vs):
+            self.soubory_poddotazu.append(os.path.relpath(i, self.cesta))
+        return sql
 
-        return temp
+    def zpracuj_sloupce_tabulky(self, tabulka: str) -> tuple[str, ...]:
+        """
+        Vrací sloupce vybrané tabulky z indexu katalogu
+        """
+        return tuple(self.katalog.get(tabulka, ()))
     
     def vytvoreni_objektu_tabulek(self) -> Self:
         """
@@ -101,7 +608,7 @@ class Jadro:
         temp: list[Tabulka] = []
 
         # Vytvoří jednotlivé tabulky ve třídách
-        for i in self.seznam_tabulek:
+        for i in self.tabulky_k_prepoctu():
             temp.append(Tabulka(i, self.zpracuj_sloupce_tabulky(i)))
 
         self.tabulky = temp
@@ -114,9 +621,7 @@ class Jadro:
         slovnik: dict = {}
 
         for i in self.tabulky:
-            radek: dict = {}
-            for j in i.sloupce:
-                radek[j] = 0
+            radek = dict.fromkeys(i.sloupce, 0)
 
             # Vytvoří slovník pro danou tabulku
             slovnik.setdefault(i.nazev, {})
@@ -146,68 +651,99 @@ class Jadro:
         Metoda projde seznam tabulek a u každé 
         tabulky zapíše JSON schéma do souboru
         """
-        n = Zapsani(self.cesta)
-
-        for i in self.seznam_tabulek:
-            vys = n.vystupni_soubor(f'{i}.txt')
-
+        def zapis(i: str) -> None:
             # zkontroluje, zda již soubory neexistují 
-            if not os.path.exists(vys):
-                n.zapsani_json(
-                    vys,
+            if not self.uloziste.existuje(i):
+                self.uloziste.zapsani(
+                    i,
                     self.ziskat_klic_a_hodnotu(self.schema, i)
                 )
             else:
                 logging.info('Soubory již existují, takže se nezapsaly.')
 
+        self.zpracovani_tabulek(zapis, self.tabulky_k_prepoctu())
+        self.uloziste.potvrzeni()
+
     def nacteni_schemat_ze_souboru(self) -> Self:
         """
-        Načti upravená schémata z textových souborů
+        Načti upravená schémata z textových souborů, soubory
+        se čtou souběžně, ale skládají se v pořadí tabulek
         """
-        n = Cteni(self.cesta)
-
-        for i in self.seznam_tabulek:
-            vs = n.vstupni_soubor(f'{i}.txt')
+        def cteni(i: str) -> dict | None:
+            data = self.uloziste.cteni(i)
 
-            if os.path.exists(vs):
-                data = n.cteni_json(vs)
-            else:
+            if data is None:
                 logging.info('Soubory s daty tabulek neexistují!')
+            return data
 
-            self.schema_upravena.update(data)
+        for data in self.zpracovani_tabulek(cteni, self.seznam_tabulek):
+            if data:
+                self.schema_upravena.update(data)
         return self
     
-    def porovnani(self, generovane, editovane) -> dict[Any]:
+    def porovnani(self, generovane: dict[Any], editovane: dict[Any]) -> Zmeny:
         """
-        Tato rekurzivní metoda zjišťuje, zda nepřibyly nové klíče
+        Zjistí, zda v editovaném schématu nepřibyly nové klíče
+        z generovaného, a chybějící klíče do něj rovnou doplní.
+        Prochází se iterativně přes zásobník, takže hloubka
+        schéma není omezená limitem rekurze
+
+        Returns:
+            přehled doplněných a nedotčených klíčů
         """
+        zmeny = Zmeny()
+        chybi = object()
 
-        for key in generovane:
-            if key in editovane:
-                if isinstance(generovane[key], dict) and isinstance(editovane[key], dict):
-                    editovane[key] = self.porovnani(generovane[key], editovane[key])
-            else:
-                # print(f'klíč není: {key}')
+        for klic, hodnota in generovane.items():
+            puvodni = editovane.get(klic, chybi)
+
+            if puvodni is chybi:
                 # byla nutná oprava, skript nepočítal 
                 # s přidáním celé tabulky i se sloupci
-                editovane[key] = generovane[key]
-
-        return editovane
+                editovane[klic] = hodnota
+                zmeny.pridane_tabulky.append(klic)
+                continue
+
+            if not (isinstance(hodnota, dict) and isinstance(puvodni, dict)):
+                zmeny.nezmenene.append(klic)
+                continue
+
+            pocet = len(zmeny.pridane_sloupce)
+            zasobnik = [((klic,), hodnota, puvodni)]
+            while zasobnik:
+                cesta, gen, edit = zasobnik.pop()
+                for k, v in gen.items():
+                    e = edit.get(k, chybi)
+                    if e is chybi:
+                        edit[k] = v
+                        zmeny.pridane_sloupce.append(cesta + (k,))
+                    elif isinstance(v, dict) and isinstance(e, dict):
+                        zasobnik.append((cesta + (k,), v, e))
+
+            if len(zmeny.pridane_sloupce) == pocet:
+                zmeny.nezmenene.append(klic)
+
+        return zmeny
     
     def porovna_a_zapise_schema(self) -> Self:
         """
         Tato metoda porovná generované schéma s již editovaným
+        a zapíše jen tabulky, do kterých se něco doplnilo
         """
         if self.schema_upravena is not None:
-            self.schema_upravena = self.porovnani(self.schema, self.schema_upravena)
-            n = Zapsani(self.cesta)
-            for i in self.seznam_tabulek:
-                vys = n.vystupni_soubor(f'{i}.txt')
+            zmeny = self.porovnani(self.schema, self.schema_upravena)
 
-                n.zapsani_json(
-                    vys,
+            def zapis(i: str) -> None:
+                self.uloziste.zapsani(
+                    i,
                     self.ziskat_klic_a_hodnotu(self.schema_upravena, i)
                 )
+
+            # soubory, které se nepodařilo načíst, se nepřepisují
+            tabulky = [i for i in zmeny.dotcene() if i not in self.chyby]
+            logging.info(f'Počet změněných schémat tabulek: {len(tabulky)}')
+            self.zpracovani_tabulek(zapis, tabulky)
+            self.uloziste.potvrzeni()
         return self
 
     def filtruj_sloupce(self) -> Self:
@@ -248,17 +784,18 @@ class Jadro:
         # projdi tabulky
         for i, ihod in self.schema_vysledne.items():
             # projdi sloupce tabulky
-            for j, jhod in ihod['sloupce'].items():
-                # u každého sloupce přidej následující atributy
-                ihod['sloupce'][j] = self.doplnovane_schema
+            for j in ihod['sloupce']:
+                # u každého sloupce přidej vlastní atributy
+                ihod['sloupce'][j] = AtributySloupce()
         logging.info('Atributy doplněné.')
+        return self
 
     def zapsani_celkoveho_schema_do_souboru(self) -> None:
         """
         Metoda projde seznam tabulek a u každé 
         tabulky zapíše JSON schéma do souboru
         """
-        n = Zapsani(self.cesta)
+        n = Zapsani(self.cesta, jen_zmeny=True)
 
         vys = n.vystupni_soubor(f'celkove.txt')
         
@@ -279,7 +816,7 @@ class Jadro:
         vs = n.vstupni_soubor(f'celkove.txt')
         
         if os.path.exists(vs):
-            data = n.cteni_json(vs)
+            data = n.cteni_json(vs, cache=True)
         else:
             logging.info('Celkový soubor s daty tabulek neexistuje!')
         self.schema_pro_sql.update(data)
@@ -291,32 +828,41 @@ class Jadro:
         musí se doplnit expost
         """
         for i, ihod in self.schema_pro_sql.items():
-            # print(f'{i=}')
+            sloupce = ihod.get('sloupce')
+            if not isinstance(sloupce, dict):
+                continue
             # projdi sloupce tabulky
-            for j, jhod in ihod.items():
-                # když sloupec nemá slovník s atributy
-                # musí se přidat
-                # print(f'{j=}')
-                if jhod == 0:
-                    # print('pravda')
-                    ihod['sloupce'][j] = self.doplnovane_schema
-                # if jhod['podminky'] == 0:
-                #     jhod['podminky'] = [['', '']]
+            for j, jhod in sloupce.items():
+                # doplněné sloupce mají záznam atributů, sloupce
+                # bez slovníku s atributy ho musí dostat
+                if isinstance(jhod, AtributySloupce):
+                    sloupce[j] = jhod.slovnik()
+                elif not isinstance(jhod, dict):
+                    sloupce[j] = AtributySloupce().slovnik()
         return self
 
     def porovna_a_zapise_celkove_schema(self) -> Self:
         """
         Tato metoda porovná generované schéma s již editovaným
         """
+        if self.manifest is not None and not self.zmenene_tabulky \
+                and not self.zmeneno('celkove.txt'):
+            logging.info('Celkové schéma se nezměnilo.')
+            return self
+
         if self.schema_pro_sql is not None:
             # print(f'{self.schema_vysledne=}')
             # print(f'{self.schema_pro_sql=}')
-            self.schema_pro_sql = self.porovnani(self.schema_vysledne, self.schema_pro_sql)
+            zmeny = self.porovnani(self.schema_vysledne, self.schema_pro_sql)
             # print(f'{self.schema_pro_sql=}')
             # kontrola atributů sloupce
             self.doplneni_atributu_do_clk_schema()
 
-            n = Zapsani(self.cesta)
+            if not zmeny:
+                logging.info('Celkové schéma se nezměnilo.')
+                return self
+
+            n = Zapsani(self.cesta, jen_zmeny=True)
             vys = n.vystupni_soubor(f'celkove.txt')
 
             n.zapsani_json(
@@ -325,88 +871,6 @@ class Jadro:
             )
         return self
 
-    def kontrola_2d_pole(self, arr: list[Any]) -> bool:
-        """
-        Kontrola 2d pole, které se používá například 
-        u JOINů nebo podmínek WHERE
-        """
-        res = False
-        for radek in arr:
-            for clen in radek:
-                if clen != '':
-                    res = True
-        return res
-    
-    def priprava_pro_sql(self) -> Self:
-        """
-        Zpracuje výsledný JSON pro sestavení SQL dotazu
-        """
-        # projdi celkové schéma
-        for i, ihod in self.schema_pro_sql.items():
-            # do klauzule FROM přidej všechny tabulky
-            self._from.append(i)
-            # projdi část schéma se sloupci
-            for j, jhod in ihod['sloupce'].items():
-                # kontrola, zda se jedná o sloupce
-                if isinstance(jhod, dict):
-                    # proměnná pro aliasy
-                    _temp = ''
-                    # sloupce
-                    _func = ''
-                    _agg = ''
-                    _whe = ''
-                    # když je hodnota agregace prázdná
-                    if jhod.get('agg') == '':
-                        # přidej do výsledku jen čistý sloupec
-                        _func += j
-                        if jhod.get('skryty') != 'ano':
-                            self._gb.append(j)
-                    # když je nastavená agregace
-                    if jhod.get('agg') != '':
-                        self.priznak_group_by = True
-                        # přidej tyto sloupce s agregací do seznamu
-                        # tak obal sloupec agregační funkcí
-                        _agg += jhod.get('agg')
-                        _agg += f'({j})'
-                        # a nastav příznak agregace na True
-                    if jhod.get('alias') != '':
-                        # když není alias sloupce prázdný, 
-                        # tak přidej alias sloupce
-                        _temp += ' as '
-                        _temp += jhod.get('alias')
-                        print(jhod.get('alias'))
-                        self._aliasy.append(jhod.get('alias'))
-                    # plus ještě kontrola aliasu 
-                    # i pro agregované sloupce
-                    # když je agregace
-                    if jhod.get('agg') != '':
-                        # tak přidej její alias
-                        _agg += _temp
-                        self._aliasy.append(_temp)
-                    else:
-                        # jinak přidej alias jen ke sloupci
-                        _func += _temp
-                    podminky = jhod.get('podminky')
-                    b = 1
-                    if self.kontrola_2d_pole(podminky):
-                        for p in podminky:
-                            # sloupec, operátor, hodnota
-                            _whe += f'{j} {p[0]} {p[1]}'
-                            # dokud je b menší než délka podmínek
-                            # přidávej operátor AND
-                            if b < len(podminky):
-                                _whe += ' and '
-                            b += 1
-                    if _agg:
-                        self._aggs.append(_agg)
-                    if _func:
-                        if jhod.get('skryty') != 'ano': 
-                            self._sloupce.append(_func)
-                    if _whe:
-                        self._where.append(_whe)
-
-        return self
-    
     def priprava_joinu_pro_sql(self) -> Self:
         """
         Metoda pro sestavení Joinů
@@ -431,7 +895,7 @@ class Jadro:
         Metoda projde seznam tabulek a u každé 
         tabulky zapíše JSON schéma do souboru
         """
-        n = Zapsani(self.cesta)
+        n = Zapsani(self.cesta, jen_zmeny=True)
 
         vys = n.vystupni_soubor(f'joiny.txt')
 
@@ -451,7 +915,7 @@ class Jadro:
         vs = n.vstupni_soubor(f'joiny.txt')
         
         if os.path.exists(vs):
-            data = n.cteni_json(vs)
+            data = n.cteni_json(vs, cache=True)
         else:
             logging.info('Celkový soubor s daty tabulek neexistuje!')
         self.joiny_vysledne.update(data)
@@ -460,9 +924,18 @@ class Jadro:
         """
         Tato metoda porovná generované schéma s již editovaným
         """
+        if self.manifest is not None and not self.manifest.katalog_zmenen() \
+                and not self.zmeneno('joiny.txt'):
+            logging.info('Schéma joinů se nezměnilo.')
+            return self
+
         if self.joiny_vysledne is not None:
-            self.joiny_vysledne = self.porovnani(self.joiny, self.joiny_vysledne)
-            n = Zapsani(self.cesta)
+            zmeny = self.porovnani(self.joiny, self.joiny_vysledne)
+            if not zmeny:
+                logging.info('Schéma joinů se nezměnilo.')
+                return self
+
+            n = Zapsani(self.cesta, jen_zmeny=True)
             vys = n.vystupni_soubor(f'joiny.txt')
 
             n.zapsani_json(
@@ -471,157 +944,294 @@ class Jadro:
             )
         return self
     
-    def nahrad_slovo(self, retezec, puvodni_slovo, nove_slovo):
+    def ulozeni_aliasu(self) -> None:
+        """
+        Metoda uloží výsledný SQL příkaz do souboru
+        """
+        z = Zapsani(self.cesta, jen_zmeny=True)
+        vys = z.vystupni_soubor('output-aliasy.sql')
+        z.zapsani_seznamu(
+            vys,
+            self._aliasy
+        )
+
+        logging.info('Aliasy zapsané v pořádku.')
+    
+    def export_metadat(self) -> None:
+        """
+        Proudově vyexportuje katalog, vybrané sloupce, sloupce
+        dotazu a joiny do jednoho excelu s listy, nebo do
+        samostatných CSV souborů output-<list>.csv
         """
-        Funkce nahradí první výskyt původního slova novým slovem v daném řetězci.
+        z = Zapsani(self.cesta)
+        listy = {
+            'katalog': self.radky_katalogu(),
+            'vyber': self.radky_vyberu(),
+            'dotaz': self.radky_dotazu(),
+            'joiny': self.radky_joinu()
+        }
+
+        if self.format_exportu == 'csv':
+            for nazev, radky in listy.items():
+                z.zapsani_csv(z.vystupni_soubor(f'output-{nazev}.csv'), radky, ';', '"')
+        elif self.format_exportu == 'xlsx':
+            z.zapsani_listu_do_excelu(z.vystupni_soubor('output-metadata.xlsx'), listy)
+        else:
+            raise ValueError(f'Neznámý formát exportu: {self.format_exportu}')
 
-        Args:
-            retezec: Zadaný řetězec.
-            puvodni_slovo: Slovo, které chceme nahradit.
-            nove_slovo: Slovo, kterým chceme nahradit původní slovo.
+        logging.info('Metadata vyexportovaná.')
 
-        Returns:
-            Nový řetězec s nahrazeným slovem.
+    def analyza_planu(self) -> None:
+        """
+        Ověří plán sestaveného dotazu nad prázdnou SQLite databází
+        z katalogu a zapíše report s doporučenými indexy
         """
+        # sqlite3 je potřeba jen pro analýzu
+        from analyza import analyza
+
+        # SQLite zná ze stylů DB-API jen ? a :nazev, dotaz v jiném
+        # stylu se pro analýzu sestaví znovu se zástupnými znaky ?
+        s = self
+        if self.paramstyle not in (None, 'qmark', 'named'):
+            s = self.sestaveni_se_stylem('qmark')
+
+        self.analyza = analyza(self.katalog, s.prikaz, self._joiny, self._where, s.hodnoty_parametru())
+        if s.kurzor:
+            self.analyza['dalsi_stranka'] = analyza(
+                self.katalog, s.prikaz_dalsi, self._joiny, self._where, s.hodnoty_dalsi_stranky()
+            )
 
-        # Najdeme index prvního výskytu původního slova
-        index = retezec.find(puvodni_slovo)
+        z = Zapsani(self.cesta, jen_zmeny=True)
+        z.zapsani_json(z.vystupni_soubor('output-analyza.json'), self.analyza)
+
+        if self.analyza['chyba']:
+            logging.info(f'Plán dotazu nelze zjistit: {self.analyza["chyba"]}')
+        for i in self.analyza.get('problemy', []):
+            logging.info(i)
+        dalsi = self.analyza.get('dalsi_stranka')
+        if dalsi is not None:
+            if dalsi['chyba']:
+                logging.info(f'Plán dotazu na další stránku nelze zjistit: {dalsi["chyba"]}')
+            for i in dalsi.get('problemy', []):
+                logging.info(f'Další stránka: {i}')
+        logging.info('Analýza plánu dotazu zapsaná.')
 
-        # ještě se musí ošetřit případ, kdy bude 
-        # na poddotaz napojená normální tabulka
-        pom_on = retezec.find('on')
+    def ulozeni_vysledneho_sql(self) -> None:
+        """
+        Metoda uloží výsledný SQL příkaz do souboru
+        """
+        z = Zapsani(self.cesta, jen_zmeny=True)
+        vys = z.vystupni_soubor('output-select.sql')
+        z.zapsani_textu(
+            vys,
+            self.prikaz
+        )
 
-        # Pokud jsme slovo našli, provedeme nahrazení
-        if index != -1 and index < pom_on:
-            return (''.join(retezec[:index]) 
-            + '(' 
-            + ''.join(nove_slovo)
-            + ') ' + puvodni_slovo 
-            + ''.join(retezec[index + len(puvodni_slovo):]))
+        # parametry patří k dotazu se zástupnými znaky, soubor
+        # z dřívějšího běhu s parametry by už neodpovídal
+        vys_parametru = z.vystupni_soubor('output-parametry.json')
+        if self.paramstyle:
+            z.zapsani_json(vys_parametru, self.hodnoty_parametru())
+        elif os.path.exists(vys_parametru):
+            os.remove(vys_parametru)
+
+        vys_dalsi = z.vystupni_soubor('output-select-dalsi.sql')
+        vys_kurzoru = z.vystupni_soubor('output-kurzor.json')
+        if self.kurzor:
+            z.zapsani_textu(vys_dalsi, self.prikaz_dalsi)
+            z.zapsani_json(vys_kurzoru, self.popis_kurzoru())
         else:
-            return retezec
+            for i in (vys_dalsi, vys_kurzoru):
+                if os.path.exists(i):
+                    os.remove(i)
 
-    def zpracovani_joinu(self) -> Self:
+        logging.info('Výsledný SQL příkaz zapsaný.')
+
+    def ulozeni_manifestu(self) -> None:
+        """
+        Zaznamená otisky vstupů a výstupu do manifestu,
+        aby příští běh mohl přeskočit nezměněné části
         """
-        Zpracuje definované joiny a přidá je do seznamů joinů
-        """
-        res: list = []
-        sql=''
-
-        for i, ihod in self.joiny_vysledne.items():
-            # print(f'{ihod=}')
-            if ihod.get('vychozi') == 1:
-                self.vychozi_tabulka = i
-            if ihod.get('je_poddotaz') == 1:
-                # otevře externí soubor s sql příkazem
-                # zkontroluje, zda je url s sql příkazem uvedeno
-                if ihod.get('sql')!='':
-                    n = Cteni(self.cesta)
-                    vs = n.vstupni_soubor(ihod.get('sql'))
-                    sql = n.cteni_seznamu(
-                        vs,
-                        'utf8',
-                        '\n'
-                    )
-                    self.poddotazy.append([i, sql])
-                else:
-                    logging.info('Není odkaz s SQL příkazem')
-            if ihod.get('vychozi') == 1 and ihod.get('je_poddotaz') == 1:
-                self.vychozi_tabulka = '(' + ' '.join(sql) + ') ' + i
-
-            vazby = ihod.get('vazba')
-            # print(f'{vazby=}')
-            if isinstance(vazby, list):
-                # vrací boolean
-                if self.kontrola_2d_pole(vazby):
-                     for i in vazby:
-                        vz = ''
-                        vz += i[0]
-                        vz += ' '
-                        vz += i[1]
-                        res.append(vz)
+        if self.manifest is None:
+            return
+        # s chybou u některé tabulky výstup neodpovídá vstupům,
+        # příští běh se proto nesmí přeskočit
+        if self.chyby:
+            logging.info('Manifest se kvůli chybám u tabulek nezapisuje.')
+            return
+
+        soubory = ['sloupce.csv']
+        # u společného úložiště stačí soubor zaznamenat jednou
+        soubory += list(dict.fromkeys(self.uloziste.soubor(i) for i in self.seznam_tabulek))
+        soubory += ['celkove.txt', 'joiny.txt']
+        soubory += list(dict.fromkeys(self.soubory_poddotazu))
+        soubory += ['output-select.sql']
+
+        self.manifest.zaznamenani(soubory, self.katalog)
+        if self.dotaz is not None:
+            self.manifest.otisk_dotazu = self.dotaz.otisk()
+        self.manifest.ulozeni()
+        logging.info('Manifest sestavení zapsaný.')
+
+
+class Schema:
 
-        # ještě ověř, zda zde vůbec nějaké joiny jsou
-        if len(res) > 0:
-            self.priznak_joinu = True
+    """
+    Hromadné vygenerování příkazů pro všechny tabulky katalogu:
+    create table, create view, šablona select a insert. Příkazy
+    se zapisují průběžně přes buffer, v paměti je vždy jen jedna
+    tabulka, takže katalog může mít tisíce tabulek
+    """
+    slozka: str = 'src'
+    # složka pro vygenerované příkazy uvnitř složky src
+    slozka_prikazu: str = 'prikazy'
+    # soubory jednotlivých druhů příkazů při zápisu do jednoho souboru na druh
+    soubory = {
+        'create': 'create.sql',
+        'view': 'view.sql',
+        'select': 'select.sql',
+        'insert': 'insert.sql'
+    }
+
+    def __init__(
+            self,
+            cesta: str,
+            jeden_soubor: bool = True,
+            radky_insertu: int = 1
+        ) -> None:
+        self.cesta = os.path.join(cesta, self.slozka)
+        self.vystup = os.path.join(self.cesta, self.slozka_prikazu)
+        self.mezera = '    '
 
-        # když je poddotaz v joinu,
-        # tak nahraď jeho krycí jméno za sql a alias
-        for i in self.poddotazy:
-            for j in res:
-                if i[0] in j:
-                    res[res.index(j)] = self.nahrad_slovo(j, i[0], i[1])
-        self._joiny = res
+        # True: jeden soubor pro každý druh příkazů,
+        # False: jeden soubor <tabulka>.sql pro každou tabulku
+        self.jeden_soubor = jeden_soubor
+        # počet řádků se zástupnými znaky v jednom insertu
+        self.radky_insertu = max(1, radky_insertu)
 
-        logging.info('Joiny zpracovány v pořádku.')
-        return self
-    
-    def zretezeni_casti_prikazu(self, arg: list[Any], carka: bool) -> str:
+        self.katalog: dict[str, list[str]] = {}
+        self.seznam_tabulek: list[str] = []
+
+    def vytvoreni_slozky_se_soubory(self) -> Self:
         """
-        Pomocná funkce pro zřetězení seznamu hodnot do 
-        výsledného řetězce
+        Vytvoří složku pro vygenerované příkazy
         """
-        res = f'{self.mezera}'
-        res += f',\n{self.mezera}'.join(arg)
+        os.makedirs(self.vystup, exist_ok=True)
+        return self
 
-        if carka:
-            res += ',\n'
-        else:
-            res += '\n'
-        return res
-    
-    def sestaveni_sql(self) -> Self:
+    def nacteni_seznamu_tabulek(self) -> Self:
         """
-        Sestavení SQL příkazu
+        Proudově načte katalog ze souboru sloupce.csv
         """
-        prikaz = 'select\n'
-        if self.priznak_group_by:
-            prikaz += self.zretezeni_casti_prikazu(self._sloupce, True)
-        else:
-            prikaz += self.zretezeni_casti_prikazu(self._sloupce, False)
+        n = Cteni(self.cesta)
+        vs = n.vstupni_soubor('sloupce.csv')
+        self.katalog = n.cteni_katalogu(vs, 'utf8', ';', '"')
+        self.seznam_tabulek = list(self.katalog)
+        logging.info(f'Počet tabulek: {len(self.seznam_tabulek)}')
+        return self
 
-        if self.priznak_group_by:
-            prikaz += self.zretezeni_casti_prikazu(self._aggs, False)
+    def prikaz_create(self, tabulka: str, sloupce: list[str]) -> str:
+        radky = f',\n{self.mezera}'.join(sloupce)
+        return f'create table {tabulka} (\n{self.mezera}{radky}\n);\n'
 
-        prikaz += 'from '
-        prikaz += self.vychozi_tabulka + '\n'
-        if self.priznak_joinu:
-            prikaz += "\n".join(self._joiny) + '\n'
+    def prikaz_view(self, tabulka: str, sloupce: list[str]) -> str:
+        return f'create view v_{tabulka} as\n{self.prikaz_select(tabulka, sloupce)}'
 
-        if len(self._where) > 0:
-            prikaz += 'where 1=1 \nand '
-            prikaz += "\nand ".join(self._where) + '\n'
-            
-        if self.priznak_group_by:
-            prikaz += 'group by \n'
-            prikaz += self.zretezeni_casti_prikazu(self._gb, False)
+    def prikaz_select(self, tabulka: str, sloupce: list[str]) -> str:
+        radky = f',\n{self.mezera}'.join(sloupce)
+        return f'select\n{self.mezera}{radky}\nfrom {tabulka};\n'
 
-        self.prikaz = prikaz
-        return self
-    
-    def ulozeni_aliasu(self) -> None:
+    def prikaz_insert(self, tabulka: str, sloupce: list[str]) -> str:
+        hodnoty = f'{self.mezera}({", ".join("?" for _ in sloupce)})'
+        radky = ',\n'.join(hodnoty for _ in range(self.radky_insertu))
+        return f'insert into {tabulka} ({", ".join(sloupce)})\nvalues\n{radky};\n'
+
+    def prikazy_tabulky(self, tabulka: str) -> dict[str, str]:
         """
-        Metoda uloží výsledný SQL příkaz do souboru
+        Vrací příkazy jedné tabulky podle druhu
         """
-        z = Zapsani(self.cesta)
-        vys = z.vystupni_soubor('output-aliasy.sql')
-        z.zapsani_seznamu(
-            vys,
-            self._aliasy
-        )
-
-        logging.info('Aliasy zapsané v pořádku.')
-    
-    def ulozeni_vysledneho_sql(self) -> None:
+        sloupce = self.katalog[tabulka]
+        return {
+            'create': self.prikaz_create(tabulka, sloupce),
+            'view': self.prikaz_view(tabulka, sloupce),
+            'select': self.prikaz_select(tabulka, sloupce),
+            'insert': self.prikaz_insert(tabulka, sloupce)
+        }
+
+    def vytvoreni_prikazu(self) -> Self:
         """
-        Metoda uloží výsledný SQL příkaz do souboru
+        Zapíše příkazy všech tabulek s aspoň jedním sloupcem,
+        buď do souborů podle druhu, nebo do souboru na tabulku
         """
-        z = Zapsani(self.cesta)
-        vys = z.vystupni_soubor('output-select.sql')
-        z.zapsani_textu(
-            vys,
-            self.prikaz
-        )
+        tabulky = [i for i in self.seznam_tabulek if self.katalog.get(i)]
+
+        if self.jeden_soubor:
+            with ExitStack() as zasobnik:
+                soubory = {
+                    druh: zasobnik.enter_context(open(
+                        os.path.join(self.vystup, nazev), 'w',
+                        encoding='utf8', buffering=VELIKOST_BUFFERU
+                    ))
+                    for druh, nazev in self.soubory.items()
+                }
+                for tabulka in tabulky:
+                    for druh, text in self.prikazy_tabulky(tabulka).items():
+                        soubory[druh].write(text)
+                        soubory[druh].write('\n')
+            for nazev in self.soubory.values():
+                zaznam_zapisu(os.path.join(self.vystup, nazev))
+        else:
+            for tabulka in tabulky:
+                vystup = os.path.join(self.vystup, f'{tabulka}.sql')
+                with open(vystup, 'w', encoding='utf8', buffering=VELIKOST_BUFFERU) as f:
+                    for text in self.prikazy_tabulky(tabulka).values():
+                        f.write(text)
+                        f.write('\n')
+                zaznam_zapisu(vystup)
+
+        logging.info(f'Příkazy vygenerované pro {len(tabulky)} tabulek.')
+        return self
 
-        logging.info('Výsledný SQL příkaz zapsaný.')
 
+def sestav_sql(
+        schema: dict[str, Any],
+        joiny: dict[str, Any] | None = None,
+        poddotazy: dict[str, str] | None = None,
+        katalog: dict[str, list[str]] | None = None
+    ) -> str:
+    """
+    Sestaví SQL příkaz čistě v paměti, bez čtení a zápisu souborů
+
+    Args:
+        schema: celkové schéma ve tvaru celkove.txt, tedy
+            {tabulka: {'sloupce': {'tabulka.sloupec': atributy}, 'alias': ''}},
+            místo slovníku atributů stačí u sloupce uvést 1
+        joiny: definice joinů ve tvaru joiny.txt
+        poddotazy: texty poddotazů podle hodnoty klíče sql v joinech
+        katalog: tabulka -> sloupce, když je zadaný, chybějící
+            napojení vybraných tabulek se dohledají automaticky
+
+    Returns:
+        výsledný SQL příkaz
+    """
+    s = Sestaveni(poddotazy, katalog)
+    s.automaticke_joiny = katalog is not None
+
+    vychozi = {'agg': '', 'alias': '', 'skryty': '', 'podminky': [['', '']], 'razeni': ''}
+    for i, ihod in schema.items():
+        sloupce = {}
+        for j, jhod in ihod.get('sloupce', {}).items():
+            # chybějící atributy se doplní výchozími hodnotami
+            sloupce[j] = {**vychozi, **jhod} if isinstance(jhod, dict) else dict(vychozi)
+        s.schema_pro_sql[i] = {'sloupce': sloupce, 'alias': ihod.get('alias', '')}
+
+    s.joiny_vysledne = joiny or {}
+
+    s.priprava_pro_sql()
+    s.zpracovani_joinu()
+    # bez určené výchozí tabulky se použije první ze schéma
+    if not s.vychozi_tabulka and s.schema_pro_sql:
+        s.vychozi_tabulka = next(iter(s.schema_pro_sql))
+    s.sestaveni_sql()
+
+    return s.prikaz
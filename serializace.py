@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import json
+import logging
+import marshal
+import os
+import threading
+from typing import Any, Callable
+from mereni import zaznam_cteni, zaznam_zapisu
+
+# Rychlejší knihovna pro JSON je volitelná
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Použitá knihovna pro JSON: 'orjson', když je nainstalovaný, jinak 'json'
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# Verze formátu binární cache, při změně se staré cache zahodí
+VERZE_CACHE = 1
+
+
+def nastaveni_backendu(nazev: str) -> None:
+    """
+    Vynutí knihovnu pro JSON: 'json' nebo 'orjson'
+    """
+    global BACKEND
+    if nazev not in ('json', 'orjson'):
+        raise ValueError(f'Neznámá knihovna pro JSON: {nazev}')
+    if nazev == 'orjson' and orjson is None:
+        raise ValueError('Knihovna orjson není nainstalovaná')
+    BACKEND = nazev
+
+
+def nacteni(data: bytes | str) -> Any:
+    """
+    Převede JSON text na Python objekt
+    """
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def vypis(
+        objekt: Any,
+        odsazeni: int | None = 4,
+        default: Callable[[Any], Any] | None = None
+    ) -> str:
+    """
+    Převede objekt na JSON text. Bez odsazení je výstup co
+    nejkratší, orjson umí odsadit jen o dvě mezery, takže
+    ručně upravované soubory s odsazením 4 zapisuje vždy json
+    """
+    if odsazeni is None:
+        if BACKEND == 'orjson':
+            return orjson.dumps(objekt, default=default).decode('utf8')
+        return json.dumps(objekt, ensure_ascii=False, separators=(',', ':'), default=default)
+    return json.dumps(objekt, ensure_ascii=False, indent=odsazeni, default=default)
+
+
+def soubor_cache(vstup: str) -> str:
+    """
+    Vrací cestu k binární cache vedle JSON souboru
+    """
+    return os.path.join(os.path.dirname(vstup), f'.{os.path.basename(vstup)}.cache')
+
+
+def cteni_cache(cache: str, klic: tuple[int, int]) -> tuple[bool, Any]:
+    """
+    Načte data z binární cache, pokud patří k souboru
+    se zadaným časem změny a velikostí
+
+    Returns:
+        (platná, data)
+    """
+    try:
+        with open(cache, 'rb') as f:
+            obsah = f.read()
+        verze, ulozeny_klic, data = marshal.loads(obsah)
+    except (OSError, EOFError, ValueError, TypeError):
+        return (False, None)
+
+    if verze != VERZE_CACHE or ulozeny_klic != klic:
+        return (False, None)
+
+    zaznam_cteni(cache, len(obsah))
+    return (True, data)
+
+
+def zapsani_cache(cache: str, klic: tuple[int, int], data: Any) -> None:
+    """
+    Zapíše data do binární cache přes dočasný soubor,
+    chyba zápisu cache sestavení nezastaví
+    """
+    docasny = f'{cache}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        obsah = marshal.dumps((VERZE_CACHE, klic, data))
+        with open(docasny, 'wb') as f:
+            f.write(obsah)
+        os.replace(docasny, cache)
+        zaznam_zapisu(cache, len(obsah))
+    except (OSError, ValueError) as e:
+        logging.info(f'Cache {cache} se nepodařilo zapsat: {e}')
+        if os.path.exists(docasny):
+            os.remove(docasny)
+
+
+def cteni_s_cache(vstup: str) -> Any:
+    """
+    Načte JSON soubor. Dokud se soubor nezmění čas změny
+    ani velikost, čte se místo něj binární cache a JSON
+    se vůbec neparsuje
+    """
+    st = os.stat(vstup)
+    klic = (st.st_mtime_ns, st.st_size)
+    cache = soubor_cache(vstup)
+
+    platna, data = cteni_cache(cache, klic)
+    if platna:
+        return data
+
+    with open(vstup, 'rb') as f:
+        obsah = f.read()
+    zaznam_cteni(vstup, len(obsah))
+
+    data = nacteni(obsah)
+    zapsani_cache(cache, klic, data)
+    return data
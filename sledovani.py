@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import logging
+import os
+import time
+from cteni import Cteni
+from main import FAZE
+from manifest import Manifest
+from query_builder import Jadro
+from uloziste import vytvoreni_uloziste
+
+# Fáze, které se při změně celkového schéma, joinů nebo
+# poddotazů spouští znovu nad schématy v paměti
+FAZE_SQL = (
+    'priprava_pro_sql',
+    'zpracovani_joinu',
+    'sestaveni_sql',
+    'ulozeni_vysledneho_sql',
+)
+
+
+class Sledovani:
+
+    """
+    Dlouho běžící režim, který drží katalog a schémata v paměti
+    a při uložení ručně upravených souborů znovu sestaví SQL.
+    Změny se zjišťují pravidelným čtením času změny a velikosti
+    souborů. Změna celkove.txt, joiny.txt nebo poddotazu spustí
+    jen fáze FAZE_SQL, změna schémat tabulek celé sestavení
+    s manifestem a změna katalogu i jeho nové načtení
+    """
+    def __init__(
+            self,
+            cesta: str,
+            pocet_vlaken: int = 1,
+            uloziste: str = 'soubory',
+            interval: float = 0.2,
+            automaticke_joiny: bool = False,
+            paramstyle: str | None = None
+        ) -> None:
+        self.cesta = cesta
+        self.slozka = os.path.join(cesta, Jadro.slozka)
+        self.pocet_vlaken = pocet_vlaken
+        self.druh_uloziste = uloziste
+        self.interval = interval
+        self.automaticke_joiny = automaticke_joiny
+        self.paramstyle = paramstyle
+
+        self.katalog: dict[str, list[str]] | None = None
+        self.jadro: Jadro | None = None
+        # cesta -> (mtime, velikost) při posledním sestavení
+        self.otisky: dict[str, tuple[int, int] | None] = {}
+
+        self.pocet_sestaveni = 0
+
+    def cesta_souboru(self, nazev: str) -> str:
+        return os.path.join(self.slozka, nazev)
+
+    def sledovane_soubory(self) -> dict[str, str]:
+        """
+        Vrací sledované soubory a druh jejich změny:
+        'katalog', 'tabulky' nebo 'sql'
+        """
+        res = {self.cesta_souboru('sloupce.csv'): 'katalog'}
+
+        if self.jadro is not None:
+            for i in self.jadro.seznam_tabulek:
+                res[self.cesta_souboru(self.jadro.uloziste.soubor(i))] = 'tabulky'
+            for i in self.jadro.soubory_poddotazu:
+                res[self.cesta_souboru(i)] = 'sql'
+
+        res[self.cesta_souboru('celkove.txt')] = 'sql'
+        res[self.cesta_souboru('joiny.txt')] = 'sql'
+        return res
+
+    def otisk(self, cesta: str) -> tuple[int, int] | None:
+        try:
+            st = os.stat(cesta)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def ulozeni_otisku(self) -> None:
+        """
+        Zapamatuje si stav souborů po sestavení, vlastní
+        zápisy sestavení se tak neberou jako změna
+        """
+        self.otisky = {i: self.otisk(i) for i in self.sledovane_soubory()}
+
+    def zmeny(self) -> dict[str, list[str]]:
+        """
+        Vrací změněné soubory podle druhu změny
+        """
+        res: dict[str, list[str]] = {}
+        for cesta, druh in self.sledovane_soubory().items():
+            if self.otisk(cesta) != self.otisky.get(cesta):
+                res.setdefault(druh, []).append(cesta)
+        return res
+
+    def uplne_sestaveni(self, nacist_katalog: bool) -> None:
+        """
+        Projde všechny fáze, katalog se čte znovu jen při jeho změně
+        """
+        if nacist_katalog or self.katalog is None:
+            n = Cteni(self.slozka)
+            self.katalog = n.cteni_katalogu(n.vstupni_soubor('sloupce.csv'), 'utf8', ';', '"')
+
+        manifest = Manifest(
+            self.slozka,
+            nastaveni=Manifest.nastaveni_sestaveni(self.paramstyle, self.automaticke_joiny)
+        )
+        uloziste = vytvoreni_uloziste(self.druh_uloziste, self.slozka)
+        jadro = Jadro(self.cesta, manifest, self.pocet_vlaken, uloziste, self.katalog)
+        jadro.automaticke_joiny = self.automaticke_joiny
+        jadro.paramstyle = self.paramstyle
+        try:
+            for faze in FAZE:
+                getattr(jadro, faze)()
+        finally:
+            uloziste.uzavreni()
+        self.jadro = jadro
+
+    def sestaveni_sql(self, celkove: bool, joiny: bool) -> None:
+        """
+        Znovu sestaví jen SQL příkaz, ze souborů se načte jen
+        změněné celkové schéma nebo joiny, zbytek zůstává v paměti
+        """
+        predchozi = self.jadro
+        jadro = Jadro(self.cesta, None, self.pocet_vlaken, predchozi.uloziste, self.katalog)
+        jadro.automaticke_joiny = self.automaticke_joiny
+        jadro.paramstyle = self.paramstyle
+        jadro.seznam_tabulek = predchozi.seznam_tabulek
+
+        if celkove:
+            jadro.nacteni_celkoveho_schema_ze_souboru()
+        else:
+            jadro.schema_pro_sql = predchozi.schema_pro_sql
+        if joiny:
+            jadro.nacteni_join_schema_ze_souboru()
+        else:
+            jadro.joiny_vysledne = predchozi.joiny_vysledne
+
+        for faze in FAZE_SQL:
+            getattr(jadro, faze)()
+        self.jadro = jadro
+
+    def kontrola(self) -> bool:
+        """
+        Jedna kontrola změn, případně se spustí sestavení
+
+        Returns:
+            True, když se sestavovalo
+        """
+        zmeny = self.zmeny()
+        if self.otisky and not zmeny:
+            return False
+
+        zacatek = time.perf_counter()
+        try:
+            if self.jadro is None or 'katalog' in zmeny or 'tabulky' in zmeny:
+                self.uplne_sestaveni('katalog' in zmeny)
+                druh = 'Celé sestavení'
+            else:
+                soubory = zmeny['sql']
+                self.sestaveni_sql(
+                    self.cesta_souboru('celkove.txt') in soubory,
+                    self.cesta_souboru('joiny.txt') in soubory
+                )
+                druh = 'Sestavení SQL'
+        except Exception as e:
+            # soubor může být rozepsaný nebo neplatný, zkusí
+            # se to znovu po jeho dalším uložení
+            logging.error(f'Sestavení se nepodařilo: {type(e).__name__}: {e}')
+            self.ulozeni_otisku()
+            return False
+
+        self.ulozeni_otisku()
+        self.pocet_sestaveni += 1
+        logging.info(f'{druh} za {(time.perf_counter() - zacatek) * 1000:.1f} ms')
+        return True
+
+    def beh(self, pocet_kontrol: int | None = None) -> None:
+        """
+        Opakuje kontroly, dokud se neukončí přes Ctrl+C
+        nebo neproběhne zadaný počet kontrol
+        """
+        logging.info(f'Sledování složky {self.slozka}, ukončení Ctrl+C')
+        pocet = 0
+        try:
+            while pocet_kontrol is None or pocet < pocet_kontrol:
+                self.kontrola()
+                pocet += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            logging.info('Sledování ukončené.')
@@ -0,0 +1,62 @@
+import pytest
+import sqlite3
+from analyza import analyza, plan_dotazu, vytvoreni_databaze
+from query_builder import Sestaveni
+
+KATALOG = {
+    'prodeje': ['prodej_id', 'datum_id', 'cena'],
+    'datumy': ['datum_id', 'rok'],
+}
+
+
+def sestaveni(paramstyle, kurzor=()):
+    s = Sestaveni(katalog=KATALOG)
+    s.paramstyle = paramstyle
+    s.schema_pro_sql = {
+        'prodeje': {'sloupce': {
+            'prodeje.datum_id': {'razeni': 'desc'},
+            'prodeje.prodej_id': {},
+        }},
+        'datumy': {'sloupce': {
+            'datumy.rok': {'podminky': [['>=', '2020'], ['in', '(2021, 2022)']]},
+        }},
+    }
+    s.joiny_vysledne = {
+        'prodeje': {'vychozi': 1, 'limit': 10, 'kurzor': list(kurzor)},
+        'datumy': {'vazba': [['left join', 'datumy on datumy.datum_id = prodeje.datum_id']]},
+    }
+    s.priprava_pro_sql()
+    s.zpracovani_joinu()
+    return s.sestaveni_sql()
+
+
+def test_plan_bez_hodnot_parametru_selze():
+    s = sestaveni('qmark')
+    spojeni = vytvoreni_databaze(KATALOG)
+    with pytest.raises(sqlite3.Error):
+        plan_dotazu(spojeni, s.prikaz)
+    assert plan_dotazu(spojeni, s.prikaz, s.hodnoty_parametru())
+
+
+@pytest.mark.parametrize('styl', [None, 'qmark', 'numeric', 'named', 'format', 'pyformat'])
+def test_analyza_s_parametry(styl):
+    s = sestaveni(styl, kurzor=('prodeje.datum_id', 'prodeje.prodej_id'))
+    # stejně jako Jadro.analyza_planu
+    if styl not in (None, 'qmark', 'named'):
+        s = s.sestaveni_se_stylem('qmark')
+
+    res = analyza(KATALOG, s.prikaz, s._joiny, s._where, s.hodnoty_parametru())
+    assert res['chyba'] is None
+    assert res['plan']
+
+    dalsi = analyza(KATALOG, s.prikaz_dalsi, s._joiny, s._where, s.hodnoty_dalsi_stranky())
+    assert dalsi['chyba'] is None
+    assert dalsi['plan']
+
+
+def test_sestaveni_se_stylem_zachova_dotaz():
+    s = sestaveni('pyformat', kurzor=('prodeje.datum_id',))
+    q = s.sestaveni_se_stylem('qmark')
+    assert '%(p1)s' in s.prikaz and '%' not in q.prikaz
+    assert q.hodnoty_parametru() == [2020, 2021, 2022]
+    assert q.prikaz.replace('?', '') == s.prikaz.replace('%(p1)s', '').replace('%(p2)s', '').replace('%(p3)s', '')
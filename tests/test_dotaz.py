@@ -0,0 +1,112 @@
+import pytest
+from dotaz import Dotaz, Podminka, Sloupec, Zdroj, bez_mezer, parametrizace, zastupny_znak
+from query_builder import Sestaveni
+
+
+def sestaveni(schema, joiny=None, paramstyle=None):
+    s = Sestaveni()
+    s.paramstyle = paramstyle
+    s.schema_pro_sql = schema
+    s.joiny_vysledne = joiny or {'t': {'vychozi': 1}}
+    s.priprava_pro_sql()
+    s.zpracovani_joinu()
+    return s.sestaveni_sql()
+
+
+def dotaz(podminky, sloupce=('t.a',), alias=''):
+    return Dotaz.sestaveni(
+        [Sloupec.vytvor(i, '', alias) for i in sloupce],
+        [],
+        Zdroj.vytvor('t'),
+        [],
+        [Podminka.vytvor(*i) for i in podminky],
+        []
+    )
+
+
+@pytest.mark.parametrize('styl, znaky', [
+    ('qmark', ('?', '?')),
+    ('numeric', (':3', ':4')),
+    ('named', (':p3', ':p4')),
+    ('format', ('%s', '%s')),
+    ('pyformat', ('%(p3)s', '%(p4)s')),
+])
+def test_zastupne_znaky_stylu(styl, znaky):
+    assert (zastupny_znak(styl, 3), zastupny_znak(styl, 4)) == znaky
+    assert parametrizace('between', '1 and 2.5', styl, 3) == (f'{znaky[0]} and {znaky[1]}', [1, 2.5])
+
+
+def test_neznamy_styl():
+    with pytest.raises(ValueError):
+        zastupny_znak('neznamy', 1)
+
+
+@pytest.mark.parametrize('operator, hodnota, text, parametry', [
+    ('=', ' 2020 ', '?', [2020]),
+    ('=', "'O''Brien'", '?', ["O'Brien"]),
+    ('in', "(1, 'a', -2e3)", '(?, ?, ?)', [1, 'a', -2000.0]),
+    ('NOT  BETWEEN', "'a' AND 'b'", '? and ?', ['a', 'b']),
+    ('>', 2020, '?', [2020]),
+    ('=', 'u.b', 'u.b', []),
+    ('is', 'null', 'null', []),
+    ('=', 'upper(x)', 'upper(x)', []),
+])
+def test_parametrizace(operator, hodnota, text, parametry):
+    assert parametrizace(operator, hodnota, 'qmark', 1) == (text, parametry)
+
+
+@pytest.mark.parametrize('styl', ['qmark', 'numeric', 'named', 'format', 'pyformat'])
+def test_parametry_v_poradi_zastupnych_znaku(styl):
+    s = sestaveni({'t': {'sloupce': {
+        't.a': {'podminky': [['>=', '2020'], ['<', 2024]]},
+        't.b': {'podminky': [['in', "('x', 'y')"]]},
+    }}}, paramstyle=styl)
+
+    assert '2020' not in s.prikaz and "'x'" not in s.prikaz
+    hodnoty = [2020, 2024, 'x', 'y']
+    if styl in ('named', 'pyformat'):
+        assert s.hodnoty_parametru() == {f'p{i}': v for i, v in enumerate(hodnoty, 1)}
+        assert all(zastupny_znak(styl, i) in s.prikaz for i in range(1, 5))
+    else:
+        assert s.hodnoty_parametru() == hodnoty
+
+
+def test_ciselna_hodnota_bez_parametru():
+    s = sestaveni({'t': {'sloupce': {'t.a': {'podminky': [['>', 2020]]}}}})
+    assert 'and t.a > 2020' in s.prikaz
+    assert s.dotaz.otisk()
+
+
+def test_cache_uzlu_rozlisuje_typy():
+    for hodnota, text in ((True, 'True'), (1, '1'), (1.0, '1.0')):
+        assert Podminka.vytvor('t.x', '=', hodnota).vykresleni() == f't.x = {text}'
+    assert Podminka.vytvor('t.x', '=', '?', (1,)).parametry[0] is not True
+
+
+def test_bez_mezer_zachova_retezce():
+    assert bez_mezer(" t.x  =\n 'a  b' ") == "t.x = 'a  b'"
+
+
+def test_otisk_nezavisi_na_kosmetice():
+    a = dotaz([('t.a', '>=', '2020'), ('t.b', '=', "'x'")])
+    b = dotaz([('t.b', '=', "  'x'"), ('t.a', '>=', '2020 ')], alias='jiny')
+    assert a.otisk() == b.otisk()
+
+
+@pytest.mark.parametrize('hodnota, stejny', [
+    ("'a b'", False),
+    ("'A  b'", False),
+    ("'a  b' ", True),
+])
+def test_otisk_rozlisi_literaly(hodnota, stejny):
+    a = dotaz([('t.a', '=', "'a  b'")])
+    b = dotaz([('t.a', '=', hodnota)])
+    assert (a.otisk() == b.otisk()) == stejny
+
+
+def test_otisk_rozlisi_hodnoty_parametru():
+    a = dotaz([('t.a', '=', '?', (1,))])
+    b = dotaz([('t.a', '=', '?', (2,))])
+    c = dotaz([('t.a', '=', ':p1', (1,))])
+    assert a.otisk() != b.otisk()
+    assert a.otisk() == c.otisk()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import logging
+import os
+import threading
+from typing import Any
+from cteni import Cteni
+from serializace import nacteni, vypis
+from zapsani import Zapsani
+
+
+class SouboroveUloziste:
+
+    """
+    Výchozí úložiště schémat, každá tabulka má vlastní
+    JSON soubor <tabulka>.txt, který se dá ručně upravit
+    """
+    def __init__(self, cesta: str) -> None:
+        self.cesta = cesta
+        self.cteni_souboru = Cteni(cesta)
+        self.zapsani_souboru = Zapsani(cesta, jen_zmeny=True)
+
+    def soubor(self, tabulka: str) -> str:
+        """
+        Vrací název souboru, ve kterém je schéma tabulky uložené
+        """
+        return f'{tabulka}.txt'
+
+    def existuje(self, tabulka: str) -> bool:
+        """
+        Zjistí, zda je schéma tabulky uložené
+        """
+        return os.path.exists(self.cteni_souboru.vstupni_soubor(self.soubor(tabulka)))
+
+    def cteni(self, tabulka: str) -> dict[str, Any] | None:
+        """
+        Načte schéma tabulky ve tvaru {tabulka: {...}}
+        """
+        vs = self.cteni_souboru.vstupni_soubor(self.soubor(tabulka))
+        if not os.path.exists(vs):
+            return None
+        return self.cteni_souboru.cteni_json(vs)
+
+    def zapsani(self, tabulka: str, data: dict[str, Any]) -> None:
+        """
+        Zapíše schéma tabulky ve tvaru {tabulka: {...}}
+        """
+        vys = self.zapsani_souboru.vystupni_soubor(self.soubor(tabulka))
+        self.zapsani_souboru.zapsani_json(vys, data)
+
+    def potvrzeni(self) -> None:
+        """
+        Soubory se zapisují hned, není co potvrzovat
+        """
+        pass
+
+    def uzavreni(self) -> None:
+        """
+        Soubory se po zápisu hned zavírají
+        """
+        pass
+
+
+class SqliteUloziste:
+
+    """
+    Úložiště všech schémat tabulek v jednom SQLite souboru,
+    jednotlivé záznamy se čtou a přepisují podle názvu tabulky
+    """
+    def __init__(self, cesta: str, nazev: str = 'schemata.db') -> None:
+        import sqlite3
+
+        self.cesta = cesta
+        self.nazev = nazev
+        # připojení sdílí i vlákna z Jadro.zpracovani_tabulek
+        self.zamek = threading.Lock()
+        self.spojeni = sqlite3.connect(
+            os.path.join(cesta, nazev),
+            check_same_thread=False
+        )
+        self.spojeni.execute(
+            'create table if not exists schemata ('
+            'tabulka text primary key, '
+            'data text not null)'
+        )
+        self.spojeni.commit()
+
+    def soubor(self, tabulka: str) -> str:
+        """
+        Všechny tabulky sdílí jeden soubor
+        """
+        return self.nazev
+
+    def existuje(self, tabulka: str) -> bool:
+        with self.zamek:
+            radek = self.spojeni.execute(
+                'select 1 from schemata where tabulka = ?', (tabulka,)
+            ).fetchone()
+        return radek is not None
+
+    def cteni(self, tabulka: str) -> dict[str, Any] | None:
+        with self.zamek:
+            radek = self.spojeni.execute(
+                'select data from schemata where tabulka = ?', (tabulka,)
+            ).fetchone()
+        if radek is None:
+            return None
+        return nacteni(radek[0])
+
+    def zapsani(self, tabulka: str, data: dict[str, Any]) -> None:
+        with self.zamek:
+            self.spojeni.execute(
+                'insert or replace into schemata (tabulka, data) values (?, ?)',
+                (tabulka, vypis(data, None))
+            )
+
+    def potvrzeni(self) -> None:
+        """
+        Potvrdí všechny zápisy od posledního potvrzení
+        jednou transakcí
+        """
+        with self.zamek:
+            self.spojeni.commit()
+
+    def uzavreni(self) -> None:
+        self.potvrzeni()
+        self.spojeni.close()
+
+    def seznam_tabulek(self) -> list[str]:
+        """
+        Vrací seznam uložených tabulek seřazený podle názvu
+        """
+        with self.zamek:
+            radky = self.spojeni.execute(
+                'select tabulka from schemata order by tabulka'
+            ).fetchall()
+        return [i[0] for i in radky]
+
+    def export_do_souboru(self, tabulky: list[str] | None = None) -> None:
+        """
+        Vypíše schémata do souborů <tabulka>.txt vedle databáze,
+        aby je bylo možné ručně upravit
+        """
+        soubory = SouboroveUloziste(self.cesta)
+
+        for i in tabulky or self.seznam_tabulek():
+            data = self.cteni(i)
+            if data is not None:
+                soubory.zapsani(i, data)
+
+        logging.info('Schémata vyexportovaná do souborů.')
+
+    def import_ze_souboru(self, tabulky: list[str]) -> None:
+        """
+        Načte ručně upravené soubory <tabulka>.txt zpět do databáze
+        """
+        soubory = SouboroveUloziste(self.cesta)
+
+        for i in tabulky:
+            data = soubory.cteni(i)
+            if data is not None:
+                self.zapsani(i, data)
+            else:
+                logging.info(f'Soubor se schématem tabulky {i} neexistuje.')
+
+        self.potvrzeni()
+        logging.info('Schémata naimportovaná ze souborů.')
+
+
+def vytvoreni_uloziste(druh: str, cesta: str) -> SouboroveUloziste | SqliteUloziste:
+    """
+    Vrací úložiště schémat podle názvu: 'soubory' nebo 'sqlite'
+    """
+    if druh == 'soubory':
+        return SouboroveUloziste(cesta)
+    if druh == 'sqlite':
+        return SqliteUloziste(cesta)
+    raise ValueError(f'Neznámé úložiště schémat: {druh}')
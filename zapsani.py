@@ -2,15 +2,26 @@
 import logging
 import os
 import csv
-import json
-from typing import Any
-from openpyxl import Workbook
+import hashlib
+import shutil
+import threading
+from typing import Any, Iterable, Sequence
+from mereni import zaznam_zapisu
+from serializace import vypis
+
+# Velikost bufferu při proudovém zápisu CSV
+VELIKOST_BUFFERU = 1 << 20
+# Nejvyšší počet řádků na jednom listu excelu
+MAX_RADKU_EXCELU = 1048576
 
 
 class Zapsani:
 
-    def __init__(self, cesta: str) -> None:
+    def __init__(self, cesta: str, jen_zmeny: bool = False) -> None:
         self.cesta = cesta
+        # V tomto režimu se soubor se stejným obsahem nepřepisuje
+        # a změny se zapisují atomicky přes dočasný soubor
+        self.jen_zmeny = jen_zmeny
 
     def vystupni_soubor(self, nazev: str) -> str:
         """ 
@@ -20,36 +31,108 @@ class Zapsani:
     
     def zapsani_csv(self, 
             vystup: str, 
-            data: list[Any],
+            data: Iterable[Sequence[Any]],
             oddelovac: str,
             uvozovky: str = None
-        ) -> None:
-        """ Metoda uloží 2D seznam do CSV souboru
+        ) -> int:
+        """ Metoda uloží 2D seznam do CSV souboru, řádky můžou
+        přicházet i z generátoru a zapisují se průběžně přes buffer
         
         Args:
-            hlavicka: list
-            data: list
             vystup: str - cesta k souboru
+            data: seznam nebo generátor řádků
+            oddelovac: oddělovač hodnot
+            uvozovky: znak pro uvozovky
         
         Return:
-            None
-        """
-        if len(data) > 0:
-            try:
-                with open(vystup, 'w', encoding='utf-8') as soubor:
-                    w = csv.writer(
-                        soubor,
-                        delimiter=oddelovac,
-                        quotechar=uvozovky,
-                        lineterminator='\n'
-                        )
-                    for ity in data:
-                        w.writerow(ity)
-            except IOError:
-                logging.info('Nezdařilo se zapsat do souboru')
-        else:
+            počet zapsaných řádků
+        """
+        radky = iter(data)
+        prvni = next(radky, None)
+        if prvni is None:
             logging.info('Data pro zápis neexistují')
+            return 0
+
+        pocet = 0
+        try:
+            with open(vystup, 'w', encoding='utf-8', buffering=VELIKOST_BUFFERU) as soubor:
+                w = csv.writer(
+                    soubor,
+                    delimiter=oddelovac,
+                    quotechar=uvozovky,
+                    lineterminator='\n'
+                    )
+                w.writerow(prvni)
+                pocet = 1
+                for ity in radky:
+                    w.writerow(ity)
+                    pocet += 1
+            zaznam_zapisu(vystup)
+        except IOError:
+            logging.info('Nezdařilo se zapsat do souboru')
+        return pocet
     
+    def stejny_obsah(self, vystup: str, data: bytes) -> bool:
+        """
+        Zjistí, zda soubor už obsahuje stejná data, nejdříve
+        se porovná velikost a teprve potom hash obsahu
+        """
+        try:
+            if os.path.getsize(vystup) != len(data):
+                return False
+
+            h = hashlib.sha256()
+            with open(vystup, 'rb') as f:
+                for blok in iter(lambda: f.read(1 << 20), b''):
+                    h.update(blok)
+        except OSError:
+            return False
+
+        return h.digest() == hashlib.sha256(data).digest()
+
+    def zapsani_obsahu(self, vystup: str, obsah: str) -> bool:
+        """
+        Zapíše text do souboru. V režimu jen_zmeny se obsah zapíše
+        jen tehdy, když se liší od existujícího souboru, a to do
+        dočasného souboru, který pak nahradí původní
+
+        Args:
+            vystup: cesta k výstupnímu souboru
+            obsah: text k zapsání
+
+        Return:
+            True, když se soubor zapsal
+        """
+        if not self.jen_zmeny:
+            with open(vystup, 'w', encoding='utf8') as soubor:
+                soubor.write(obsah)
+            zaznam_zapisu(vystup)
+            return True
+
+        # stejné konce řádek, jaké by zapsal textový režim
+        data = obsah.replace('\n', os.linesep).encode('utf8')
+        if self.stejny_obsah(vystup, data):
+            return False
+
+        # dočasný soubor musí být ve stejné složce, aby
+        # přejmenování bylo atomické
+        docasny = os.path.join(
+            os.path.dirname(vystup),
+            f'.{os.path.basename(vystup)}.{os.getpid()}.{threading.get_ident()}.tmp'
+        )
+        try:
+            with open(docasny, 'wb') as soubor:
+                soubor.write(data)
+            if os.path.exists(vystup):
+                shutil.copymode(vystup, docasny)
+            os.replace(docasny, vystup)
+        except BaseException:
+            if os.path.exists(docasny):
+                os.remove(docasny)
+            raise
+        zaznam_zapisu(vystup, len(data))
+        return True
+
     def zapsani_seznamu(self, vystup: str, obsah: list) -> None:
         """ 
         Zápis dat do souboru s omezením na počet řádek
@@ -59,11 +142,10 @@ class Zapsani:
             obsah: data k zapsání
         """
         try:
-            with open(vystup, 'w+', encoding='utf8') as soubor_vystup:
-                for ity in obsah:
-                    soubor_vystup.write(f'{ity}\n')
-                soubor_vystup.close()
+            if self.zapsani_obsahu(vystup, ''.join(f'{ity}\n' for ity in obsah)):
                 logging.info('Upravená data zapsaná')
+            else:
+                logging.info('Data se nezměnila, soubor se nepřepsal')
         except IOError:
             logging.info('Nezdařilo se zapsat do souboru')
 
@@ -76,31 +158,93 @@ class Zapsani:
             obsah: data k zapsání
         """
         try:
-            with open(vystup, 'w+', encoding='utf8') as soubor:
-                soubor.write(f'{obsah}')
-                soubor.close()
+            if self.zapsani_obsahu(vystup, f'{obsah}'):
                 logging.info('Upravená data zapsaná')
+            else:
+                logging.info('Data se nezměnila, soubor se nepřepsal')
         except IOError:
             logging.info('Nezdařilo se zapsat do souboru')  
 
-    def zapsani_textu_do_excelu(self, vystup: str, obsah: list[Any]) -> None:
+    def zapsani_textu_do_excelu(self, vystup: str, obsah: Iterable[Sequence[Any]]) -> None:
+        """
+        Zápis řádků do jednoho listu excelu
+        """
+        self.zapsani_listu_do_excelu(vystup, {'Sheet': obsah}, hlavicka=False)
+
+    def zapsani_listu_do_excelu(
+            self,
+            vystup: str,
+            listy: dict[str, Iterable[Sequence[Any]]],
+            hlavicka: bool = True
+        ) -> None:
+        """
+        Proudový zápis listů do excelu v režimu write-only, řádky
+        se v paměti nedrží. Když se řádky nevejdou na jeden list,
+        pokračuje se na listu <název>_2 atd., případně se stejnou
+        hlavičkou
+
+        Args:
+            vystup: cesta k výstupnímu souboru
+            listy: název listu -> seznam nebo generátor řádků
+            hlavicka: první řádek je hlavička
+        """
+        # openpyxl se načítá pomalu a pro sestavení SQL
+        # není potřeba, importuje se až při zápisu do excelu
+        from openpyxl import Workbook
+
         # Vytvoření nového Excel souboru
-        wb = Workbook()
-        ws = wb.active
+        wb = Workbook(write_only=True)
+
+        for nazev, obsah in listy.items():
+            radky = iter(obsah)
+            ws = wb.create_sheet(nazev)
+            prvni = next(radky, None) if hlavicka else None
+            if prvni is not None:
+                ws.append(prvni)
+            pocet = 1 if prvni is not None else 0
+            poradi = 1
 
-        # Zápis dat do Excelu
-        for row in obsah:
-            ws.append(row)
+            # Zápis dat do Excelu
+            for row in radky:
+                if pocet == MAX_RADKU_EXCELU:
+                    poradi += 1
+                    ws = wb.create_sheet(f'{nazev}_{poradi}')
+                    pocet = 0
+                    if prvni is not None:
+                        ws.append(prvni)
+                        pocet = 1
+                ws.append(row)
+                pocet += 1
 
         # Uložení souboru
         wb.save(vystup)
+        zaznam_zapisu(vystup)
         logging.info('Data do excelu zapsaná v pořádku.')
 
-    def zapsani_json(self, vystup: str, slovnik: dict[Any]) -> None:
+    @staticmethod
+    def serializace(objekt: Any) -> Any:
         """
-        Zápis slovníku do JSON souboru
+        Převod objektů, které JSON nezná, např. záznamů
+        atributů sloupců, které mají metodu slovnik()
         """
-        with open(vystup, 'w', encoding='utf-8') as file:
-            json.dump(slovnik, file, ensure_ascii=False, indent=4)
+        slovnik = getattr(objekt, 'slovnik', None)
+        if slovnik is None:
+            raise TypeError(f'Objekt typu {type(objekt).__name__} nelze zapsat do JSON')
+        return slovnik()
 
-        logging.info(f"Data byla úspěšně zapsána do souboru {vystup}")
\ No newline at end of file
+    def zapsani_json(
+            self,
+            vystup: str,
+            slovnik: dict[Any],
+            odsazeni: int | None = 4
+        ) -> None:
+        """
+        Zápis slovníku do JSON souboru, ručně upravované
+        soubory jsou odsazené, strojové můžou být bez odsazení
+        """
+        obsah = vypis(slovnik, odsazeni, self.serializace)
+
+        if self.zapsani_obsahu(vystup, obsah):
+            logging.info(f"Data byla úspěšně zapsána do souboru {vystup}")
+        else:
+            logging.info(f"Soubor {vystup} se nezměnil, nepřepsal se")
\ No newline at end of file